@@ -1,6 +1,9 @@
 import openai
 import streamlit as st
 import os
+from shared_cache import shared_cache
+from memory_cache import memory_cache
+from request_scheduler import OPENAI_RETRYABLE_ERRORS, scheduled_call
 
 # Access OpenAI API key from secrets
 if hasattr(st, "secrets") and "GITHUB_ACTIONS" not in os.environ:
@@ -14,6 +17,12 @@ if not OPENAI_API_KEY:
 
 openai.api_key = OPENAI_API_KEY
 
+# One client for the whole process so its connection pool is reused;
+# retries are handled by request_scheduler rather than the SDK.
+client = openai.OpenAI(api_key=OPENAI_API_KEY, max_retries=0)
+
+AI_UNAVAILABLE_PREFIX = "🤖 AI Analysis Unavailable"
+
 def generate_ai_commentary(stock, financials, scores):
     """
     Generate a concise, actionable AI-powered stock commentary.
@@ -61,8 +70,10 @@ def generate_ai_commentary(stock, financials, scores):
               "3. Short-term outlook")
 
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
+        response = scheduled_call(
+            "openai",
+            client.chat.completions.create,
+            retry_on=OPENAI_RETRYABLE_ERRORS,
             model="gpt-3.5-turbo",
             messages=[
                 {
@@ -79,9 +90,14 @@ def generate_ai_commentary(stock, financials, scores):
         return response.choices[0].message.content.strip()
 
     except openai.OpenAIError as e:
-        return f"🤖 AI Analysis Unavailable: {str(e)}"
+        return f"{AI_UNAVAILABLE_PREFIX}: {str(e)}"
+
+def is_commentary_cacheable(commentary):
+    """Transient API failures must not be cached, or they would stick for an hour on every worker."""
+    return not commentary.startswith(AI_UNAVAILABLE_PREFIX)
 
 # Optional: Add caching to reduce API calls
-@st.cache_data(ttl=3600)  # Cache for 1 hour
+@memory_cache(ttl=3600, max_entries=200, cache_if=is_commentary_cacheable)  # Cache for 1 hour, within the memory budget
+@shared_cache(ttl=3600, cache_if=is_commentary_cacheable)  # Shared across Streamlit workers
 def cached_ai_commentary(stock, financials, scores):
     return generate_ai_commentary(stock, financials, scores)
@@ -0,0 +1,94 @@
+import pandas as pd
+
+from memory_cache import derived_cache
+
+# Finest resolution and longest window we download; every other view is derived locally
+BASE_INTERVAL = "1d"
+FETCH_PERIOD = "1y"
+
+# Aggregation rules for yfinance OHLCV columns when downsampling
+RESAMPLE_RULES = {"1d": None, "1wk": "W-FRI", "1mo": "M"}
+OHLCV_AGGREGATION = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Volume": "sum",
+    "Dividends": "sum",
+    "Stock Splits": "max",
+}
+
+# yfinance-style period strings accepted as windows
+WINDOW_OFFSETS = {
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+}
+
+VIEW_TTL = 60 * 60  # Seconds; views never outlive the snapshot they come from anyway
+MAX_VIEWS_PER_SNAPSHOT = 64  # Views kept per snapshot, e.g. 8 charted tickers x 8 resolution/window picks
+
+
+def resample_bars(bars, resolution="1d", window="6mo"):
+    """
+    Derive a coarser and/or shorter view from base-resolution bars.
+
+    Parameters:
+    - bars (pd.DataFrame): Daily OHLCV bars indexed by timestamp.
+    - resolution (str): One of "1d", "1wk", "1mo".
+    - window (str): One of the WINDOW_OFFSETS keys, "ytd" or "max".
+
+    Returns:
+    - pd.DataFrame: The resampled bars (empty if the input is empty).
+
+    Raises:
+    - ValueError: If the resolution or window is not supported.
+    """
+    if resolution not in RESAMPLE_RULES:
+        raise ValueError(f"Unsupported resolution: {resolution}")
+    if window not in WINDOW_OFFSETS and window not in ("ytd", "max"):
+        raise ValueError(f"Unsupported window: {window}")
+
+    if bars is None or len(bars) == 0:
+        return bars
+
+    # Window first so resampling only touches the rows we keep
+    end = bars.index[-1]
+    if window == "ytd":
+        bars = bars[bars.index >= end.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)]
+    elif window != "max":
+        bars = bars[bars.index > end - WINDOW_OFFSETS[window]]
+
+    rule = RESAMPLE_RULES[resolution]
+    if rule is None:
+        return bars
+
+    aggregation = {col: OHLCV_AGGREGATION.get(col, "last") for col in bars.columns}
+    resampled = bars.resample(rule).agg(aggregation)
+    # Weeks/months with no trading days come back without a close
+    return resampled.dropna(subset=["Close"]) if "Close" in resampled else resampled
+
+
+@derived_cache(ttl=VIEW_TTL, max_entries=MAX_VIEWS_PER_SNAPSHOT)
+def get_bars(stock_data, ticker, resolution="1d", window="6mo"):
+    """
+    Serve a view of a ticker's bars from a data snapshot, without any network call.
+
+    Views are cached inside the snapshot's memory cache entry, so they count
+    against the memory budget and are dropped together with the snapshot.
+
+    Parameters:
+    - stock_data (dict): Snapshot from fetch_stock_data; each ticker carries its base "bars".
+    - ticker (str): Stock ticker.
+    - resolution (str): One of "1d", "1wk", "1mo".
+    - window (str): One of the WINDOW_OFFSETS keys, "ytd" or "max".
+
+    Returns:
+    - pd.DataFrame | None: The requested view, or None if the snapshot has no bars for the ticker.
+    """
+    bars = (stock_data.get(ticker) or {}).get("bars")
+    if bars is None:
+        return None
+    return resample_bars(bars, resolution, window)
@@ -0,0 +1,324 @@
+import ast
+import difflib
+
+# Lines the model uses to say "the rest of this is unchanged"
+ELISION_MARKERS = {"...", "# ...", "pass  # ..."}
+
+# Above this many lines a changed definition is taken verbatim instead of line-diffed
+MAX_DIFF_LINES = 2000
+
+# How alike two lines or statements must be (difflib ratio) to count as an edit of one another
+SIMILARITY_THRESHOLD = 0.6
+
+# Share of the original's top-level statements a marker-free reply must contain to count as a full file
+FULL_FILE_COVERAGE = 0.5
+
+
+def is_elision_marker(line):
+    """Return True if a line is a placeholder standing in for unchanged code."""
+    stripped = line.strip()
+    return stripped in ELISION_MARKERS or stripped.startswith("# ...")
+
+
+def _segment_key(node, source_lines):
+    """
+    Build a stable identity for a top-level statement.
+
+    Definitions and simple assignments are keyed by name so a changed body
+    still matches its original; anything else is keyed by its exact source.
+    """
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return ("def", node.name)
+    if isinstance(node, ast.ClassDef):
+        return ("class", node.name)
+    if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+        return ("assign", node.targets[0].id)
+    if isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+        return ("assign", node.target.id)
+    if isinstance(node, ast.If) and "__name__" in ast.unparse(node.test) and "__main__" in ast.unparse(node.test):
+        return ("main",)
+    text = "\n".join(source_lines[node.lineno - 1:node.end_lineno]).strip()
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return ("import", text)
+    return ("stmt", text)
+
+
+def split_top_level(source):
+    """
+    Split Python source into top-level segments.
+
+    Each segment carries the comments and blank lines that precede it, so
+    joining the segment texts back together reproduces the source exactly.
+
+    Parameters:
+    - source (str): Python source code.
+
+    Returns:
+    - list: ``(key, text, node)`` tuples in file order. A trailing block of
+      comments with no statement after it gets the key ``("trailer",)``.
+
+    Raises:
+    - SyntaxError: If the source cannot be parsed.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines(keepends=True)
+    plain_lines = [line.rstrip("\r\n") for line in lines]
+
+    segments = []
+    cursor = 0
+    for index, node in enumerate(tree.body):
+        end = node.end_lineno
+        if end <= cursor:
+            # Shares a line with the previous statement (``a = 1; b = 2``); already in its text
+            continue
+
+        if index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) \
+                and isinstance(node.value.value, str):
+            key = ("docstring",)
+        elif isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and node.value.value is Ellipsis:
+            key = ("elision",)
+        else:
+            key = _segment_key(node, plain_lines)
+
+        segments.append((key, "".join(lines[cursor:end]), node))
+        cursor = end
+
+    if cursor < len(lines):
+        trailer = "".join(lines[cursor:])
+        if trailer.strip():
+            segments.append((("trailer",), trailer, None))
+        elif segments:
+            key, text, node = segments[-1]
+            segments[-1] = (key, text + trailer, node)
+
+    return segments
+
+
+def _similar_lines(old_line, new_line):
+    """Return True if a new line looks like an edited version of an old one."""
+    return difflib.SequenceMatcher(None, old_line.strip(), new_line.strip()).ratio() >= SIMILARITY_THRESHOLD
+
+
+def _fill_elisions(original_text, new_text):
+    """
+    Replace elision markers inside a changed definition with the original lines.
+
+    The two versions are aligned with a line diff. Inside each differing
+    region, edited lines (``return x`` -> ``return x + 1``) are paired with
+    the old lines they resemble, so those are replaced rather than copied
+    back in. Each marker is then replaced by the original lines lying between
+    its aligned neighbours.
+    """
+    new_lines = new_text.splitlines(keepends=True)
+    if not any(is_elision_marker(line) for line in new_lines):
+        return new_text
+
+    old_lines = original_text.splitlines(keepends=True)
+    if len(old_lines) + len(new_lines) > MAX_DIFF_LINES:
+        return new_text
+
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    new_to_old = {}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(j2 - j1):
+                new_to_old[j1 + offset] = i1 + offset
+            continue
+        # Pair edited lines with the old lines they replace, keeping file order
+        i = i1
+        for j in range(j1, j2):
+            if is_elision_marker(new_lines[j]):
+                continue
+            for candidate in range(i, i2):
+                if _similar_lines(old_lines[candidate], new_lines[j]):
+                    new_to_old[j] = candidate
+                    i = candidate + 1
+                    break
+
+    merged = []
+    filled_until = 0  # Consecutive markers must not copy the same old lines twice
+    for j, line in enumerate(new_lines):
+        if not is_elision_marker(line):
+            merged.append(line)
+            continue
+
+        prev_j = j - 1
+        while prev_j >= 0 and prev_j not in new_to_old:
+            prev_j -= 1
+        next_j = j + 1
+        while next_j < len(new_lines) and next_j not in new_to_old:
+            next_j += 1
+
+        old_start = max(new_to_old[prev_j] + 1 if prev_j >= 0 else 0, filled_until)
+        old_end = new_to_old[next_j] if next_j < len(new_lines) else len(old_lines)
+        if old_start < old_end:
+            merged.extend(old_lines[old_start:old_end])
+            filled_until = old_end
+
+    return "".join(merged)
+
+
+def _match_statements(original_segments, new_segments):
+    """
+    Pair edited top-level statements with the original statements they replace.
+
+    Statements other than definitions and simple assignments are keyed by their
+    exact source, so an edited ``with``/``if``/call block would otherwise look
+    like a new statement and be added next to its old version. Each unmatched
+    new statement is paired with the most similar unmatched original statement
+    of the same kind (same first line, or a close enough text match).
+
+    Returns:
+    - dict: New segment key -> original segment key it replaces.
+    """
+    new_keys = {key for key, _, _ in new_segments}
+    unclaimed = [(key, text, node) for key, text, node in original_segments
+                 if key[0] == "stmt" and key not in new_keys]
+    pairs = {}
+    original_keys = {key for key, _, _ in original_segments}
+    for key, _, node in new_segments:
+        if key[0] != "stmt" or key in pairs or key in original_keys:
+            continue
+        first_line = key[1].splitlines()[0]
+        best, best_score = None, SIMILARITY_THRESHOLD
+        for candidate in unclaimed:
+            old_key, _, old_node = candidate
+            if type(old_node) is not type(node):
+                continue
+            if old_key[1].splitlines()[0] == first_line:
+                score = 1.0
+            else:
+                matcher = difflib.SequenceMatcher(None, old_key[1], key[1], autojunk=False)
+                score = matcher.ratio() if matcher.quick_ratio() >= best_score else 0.0
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is not None:
+            unclaimed.remove(best)
+            pairs[key] = best[0]
+    return pairs
+
+
+def _split_leading_comments(text):
+    """Split a segment into the blank/comment lines before its statement and the rest."""
+    lines = text.splitlines(keepends=True)
+    index = 0
+    while index < len(lines) and (not lines[index].strip() or lines[index].lstrip().startswith("#")):
+        index += 1
+    return "".join(lines[:index]), "".join(lines[index:])
+
+
+def _replace_segment(old_text, new_text):
+    """
+    Merge a changed statement into its original text.
+
+    The original's surrounding blank lines are kept, and so are its leading
+    comments unless the new version brings its own.
+    """
+    old_prefix, old_body = _split_leading_comments(old_text)
+    new_prefix, new_body = _split_leading_comments(new_text)
+    if any(line.strip() and not is_elision_marker(line) for line in new_prefix.splitlines()):
+        prefix = old_prefix[:len(old_prefix) - len(old_prefix.lstrip("\n"))] + new_prefix.lstrip("\n")
+    else:
+        prefix = old_prefix
+    return prefix + _fill_elisions(old_body, new_body)
+
+
+def _ensure_separated(key, text):
+    """Make sure an inserted definition is separated from its neighbour by a blank line."""
+    if key[0] not in ("def", "class") or text.startswith("\n"):
+        return text
+    return "\n" + text
+
+
+def _is_full_file(original_segments, new_segments, edited, new_content):
+    """
+    Decide whether new content is a complete module rather than a snippet.
+
+    A full file has no elision markers and contains (possibly edited) most of
+    the original's top-level statements; anything it leaves out was deleted.
+    """
+    if any(is_elision_marker(line) for line in new_content.splitlines()):
+        return False
+    original_keys = {key for key, _, _ in original_segments if key != ("trailer",)}
+    if not original_keys:
+        return False
+    covered = original_keys & {edited.get(key, key) for key, _, _ in new_segments}
+    return len(covered) >= FULL_FILE_COVERAGE * len(original_keys)
+
+
+def merge_python_source(original_content, new_content):
+    """
+    Merge a (possibly partial) new version of a module into the original.
+
+    Top-level statements are matched by identity rather than by line:
+    functions and classes by name, simple assignments by target, and any
+    other statement by its source, falling back to the most similar original
+    statement of the same kind when it was edited. Matched statements that changed are
+    replaced in place, new statements are inserted after their predecessor in
+    the new version, and statements only present in the original are kept.
+    A full file (no elision markers, most original statements present) is
+    taken as-is instead, so statements it drops or renames are removed.
+    Line diffs only run inside changed definitions that contain elision
+    markers (``...`` or ``# ...``), so the cost is bounded by the size of
+    the edit rather than the size of the file. Merging the same new content
+    twice gives the same result as merging it once.
+
+    Parameters:
+    - original_content (str): Current file content.
+    - new_content (str): Proposed content, either a full file or a snippet.
+
+    Returns:
+    - str: Merged source.
+
+    Raises:
+    - SyntaxError: If either version cannot be parsed.
+    """
+    original_segments = split_top_level(original_content)
+    new_segments = [seg for seg in split_top_level(new_content) if seg[0] not in (("elision",), ("trailer",))]
+    edited = _match_statements(original_segments, new_segments)
+    if _is_full_file(original_segments, new_segments, edited, new_content):
+        return new_content
+
+    merged = [[key, text] for key, text, _ in original_segments]
+    positions = {}
+    for index, (key, _) in enumerate(merged):
+        positions.setdefault(key, index)
+
+    def default_anchor(key):
+        """Index of the original segment a new statement without a predecessor goes after."""
+        if key[0] == "import":
+            imports = [i for i, (k, _) in enumerate(merged) if k[0] in ("import", "docstring")]
+            return imports[-1] if imports else -1
+        for i, (k, _) in enumerate(merged):
+            if k in (("main",), ("trailer",), ("elision",)):
+                return i - 1
+        return len(merged) - 1
+
+    # New statements are collected per anchor and spliced in once at the end
+    inserted = {}
+    inserted_keys = {}
+    previous_key = None
+    for key, text, _ in new_segments:
+        key = edited.get(key, key)
+        if key in positions:
+            index = positions[key]
+            old_text = merged[index][1]
+            if old_text.strip() != text.strip():
+                merged[index][1] = _replace_segment(old_text, text)
+        elif key not in inserted_keys:
+            if previous_key in positions:
+                anchor = positions[previous_key]
+            elif previous_key in inserted_keys:
+                anchor = inserted_keys[previous_key]
+            else:
+                anchor = default_anchor(key)
+            inserted.setdefault(anchor, []).append(_ensure_separated(key, text) if anchor >= 0 else text)
+            inserted_keys[key] = anchor
+        previous_key = key
+
+    texts = list(inserted.get(-1, []))
+    for index, (_, text) in enumerate(merged):
+        texts.append(text)
+        texts.extend(inserted.get(index, []))
+    return "".join(text if text.endswith("\n") or i == len(texts) - 1 else text + "\n"
+                   for i, text in enumerate(texts))
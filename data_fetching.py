@@ -1,8 +1,13 @@
 import yfinance as yf
-import requests
-import textblob
+from request_scheduler import is_transient_error, scheduled_call, scheduled_request
+from sentiment import aggregate_sentiment, batch_polarity
 import streamlit as st
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bar_store import BASE_INTERVAL, FETCH_PERIOD, resample_bars
+from stock_scoring import MIN_PRICE_BARS
+from ticker_health import (record_source_result, record_ticker_failure, record_ticker_success,
+                           should_fetch, source_available)
 
 # Check if running in Streamlit (st.secrets exists)
 if hasattr(st, "secrets") and "GITHUB_ACTIONS" not in os.environ:
@@ -14,49 +19,128 @@ else:
 if not NEWS_API_KEY:
     raise ValueError("❌ ERROR: NEWS_API_KEY is missing! Set it in Streamlit Secrets or GitHub Actions.")
 
-def fetch_stock_data(stock_list):
+NEWS_ARTICLE_WINDOW = 5  # Articles scored per ticker
+NEWS_RECENCY_HALF_LIFE_HOURS = None  # e.g. 24 to weight recent articles more; None for a plain mean
+FETCH_WORKERS = 8  # Threads fetching tickers; request_scheduler enforces the per-provider caps
+
+def fetch_ticker_data(stock):
+    """
+    Fetch price bars, financials and news sentiment for one ticker.
+
+    Parameters:
+    stock (str): Stock ticker.
+
+    Returns:
+    dict or None: The ticker's stock data, or None if it was skipped or failed.
+    """
+    # Known-bad symbols and tripped sources are skipped until their next probe
+    if not should_fetch(stock) or not source_available("yahoo"):
+        return None
+
+    try:
+        ticker = yf.Ticker(stock)
+        bars = scheduled_call("yahoo", ticker.history, period=FETCH_PERIOD, interval=BASE_INTERVAL)
+        data = resample_bars(bars, "1d", "6mo")  # Scoring lookback; other views are resampled locally
+        if data is None or len(data) < MIN_PRICE_BARS:
+            # Yahoo answered, so the source is fine; the symbol just isn't scorable
+            record_source_result("yahoo", True)
+            record_ticker_failure(stock, f"only {0 if data is None else len(data)} price bars")
+            return None
+        info = scheduled_call("yahoo", lambda: ticker.info)
+        record_source_result("yahoo", True)
+
+        financial_data = {
+            "market_cap": info.get("marketCap"),
+            "sector": info.get("sector"),
+            "industry": info.get("industry"),
+            "pe_ratio": info.get("trailingPE"),
+            "debt_equity": info.get("debtToEquity"),
+            "return_on_equity": info.get("returnOnEquity"),
+            "profit_margin": info.get("profitMargins"),
+            "rsi": None,  # Placeholder for RSI (to be calculated)
+        }
+
+        news_sentiment = fetch_news_sentiment(stock)  # ✅ Fetch news sentiment
+
+        record_ticker_success(stock)
+        return {
+            "price_data": data,
+            "bars": bars,  # Full base-resolution history, so workers reading the shared cache can chart any window
+            "financials": financial_data,
+            "news_sentiment": news_sentiment  # ✅ Store in stock_data
+        }
+
+    except Exception as e:
+        print(f"Error fetching {stock}: {e}")
+        if is_transient_error(e):
+            # Transport/HTTP errors say Yahoo is down, not the ticker; leave it out of the negative cache
+            record_source_result("yahoo", False)
+        else:
+            # A bad symbol or missing field is the ticker's problem
+            record_source_result("yahoo", True)
+            record_ticker_failure(stock, str(e))
+        return None
+
+def iter_stock_data(stock_list, max_workers=FETCH_WORKERS):
+    """
+    Fetch stock data concurrently, yielding each ticker as soon as it completes.
+
+    Parameters:
+    stock_list (list): A list of stock tickers.
+    max_workers (int): Number of tickers fetched in parallel.
+
+    Yields:
+    tuple: (stock, data) in completion order; data is None for skipped or failed tickers.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_ticker_data, stock): stock for stock in stock_list}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def fetch_stock_data(stock_list, on_result=None):
     """
     Fetch stock data for a list of stock tickers.
 
     Parameters:
     stock_list (list): A list of stock tickers.
+    on_result (callable): Optional callback invoked with (stock, data) as each ticker completes.
 
     Returns:
     dict: A dictionary containing stock data for each ticker.
     """
-    stock_data = {}  # ✅ Initialize stock_data at the beginning
+    results = {}
+    for stock, data in iter_stock_data(stock_list):
+        results[stock] = data
+        if on_result is not None:
+            on_result(stock, data)
 
-    for stock in stock_list:
-        try:
-            ticker = yf.Ticker(stock)
-            data = ticker.history(period="6mo")
-            info = ticker.info
+    # Tickers skipped by a half-open breaker or hit by a transient error get one more pass
+    for stock, data in iter_stock_data(incomplete_tickers(results)):
+        results[stock] = data
+        if on_result is not None:
+            on_result(stock, data)
 
-            financial_data = {
-                "market_cap": info.get("marketCap"),
-                "sector": info.get("sector"),
-                "industry": info.get("industry"),
-                "pe_ratio": info.get("trailingPE"),
-                "debt_equity": info.get("debtToEquity"),
-                "return_on_equity": info.get("returnOnEquity"),
-                "profit_margin": info.get("profitMargins"),
-                "rsi": None,  # Placeholder for RSI (to be calculated)
-            }
+    return {stock: results[stock] for stock in stock_list}  # Keep the caller's ticker order
 
-            news_sentiment = fetch_news_sentiment(stock)  # ✅ Fetch news sentiment
+def incomplete_tickers(stock_data):
+    """
+    List tickers missing from a snapshot for reasons unrelated to the ticker itself.
 
-            stock_data[stock] = {
-                "price_data": data,
-                "financials": financial_data,
-                "news_sentiment": news_sentiment  # ✅ Store in stock_data
-            }
+    Known-bad tickers are in the negative cache. A missing ticker that is not
+    was either blocked by a source's circuit breaker or hit a transient error,
+    so its absence says nothing about the ticker.
 
-        except Exception as e:
-            print(f"Error fetching {stock}: {e}")
-            stock_data[stock] = None
+    Parameters:
+    stock_data (dict): Output of fetch_stock_data.
 
+    Returns:
+    list: Tickers that a later fetch would try again.
+    """
+    return [stock for stock, data in stock_data.items() if data is None and should_fetch(stock)]
 
-    return stock_data
+def is_complete_snapshot(stock_data):
+    """Return True if every missing ticker is a known-bad one, i.e. the snapshot is fit to cache."""
+    return not incomplete_tickers(stock_data)
 
 def fetch_news_sentiment(stock):
     """
@@ -71,23 +155,28 @@ def fetch_news_sentiment(stock):
         - Negative = Bearish sentiment
         - 0 = Neutral sentiment
     """
+    if not source_available("newsapi"):
+        return 0  # NewsAPI circuit breaker is open; stay neutral without calling it
+
     url = f"https://newsapi.org/v2/everything?q={stock}&language=en&apiKey={NEWS_API_KEY}"
 
     try:
-        response = requests.get(url)
+        response = scheduled_request("newsapi", "GET", url)
+        record_source_result("newsapi", response.status_code == 200)
         articles = response.json().get("articles", [])
 
-        sentiment_scores = []
-        for article in articles[:5]:  # Only analyze top 5 articles
-            text = article.get("title", "") + " " + article.get("description", "")
-            sentiment = textblob.TextBlob(text).sentiment.polarity
-            sentiment_scores.append(sentiment)
+        articles = articles[:NEWS_ARTICLE_WINDOW]
+        texts = [(article.get("title") or "") + " " + (article.get("description") or "") for article in articles]
+        sentiment_scores = batch_polarity(texts)  # Whole window scored in one vectorized pass
 
-        if sentiment_scores:
-            return sum(sentiment_scores) / len(sentiment_scores)  # Average sentiment score
-        else:
-            return 0  # Neutral sentiment if no news found
+        # Average sentiment score (recency-weighted if configured); neutral if no news found
+        return aggregate_sentiment(
+            sentiment_scores,
+            published_at=[article.get("publishedAt") for article in articles],
+            half_life_hours=NEWS_RECENCY_HALF_LIFE_HOURS,
+        )
 
     except Exception as e:
         print(f"Error fetching news sentiment for {stock}: {e}")
+        record_source_result("newsapi", not is_transient_error(e))
         return 0  # Default to neutral if error occurs
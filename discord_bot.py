@@ -1,6 +1,6 @@
+import asyncio
 import discord
 import openai
-import requests
 import os
 import streamlit as st
 import base64
@@ -8,6 +8,8 @@ import traceback
 import json
 import ast  # Safer than eval()
 import difflib
+from code_merge import merge_python_source
+from request_scheduler import OPENAI_RETRYABLE_ERRORS, scheduled_call, scheduled_request
 
 # Detect if running in GitHub Actions
 RUNNING_IN_GITHUB = "GITHUB_ACTIONS" in os.environ
@@ -35,7 +37,7 @@ if not DISCORD_BOT_TOKEN or not OPENAI_API_KEY or not REPO_NAME or not TOKEN_REP
 print("✅ All secrets loaded successfully. Starting bot...")
 
 # Initialize OpenAI API
-client_openai = openai.OpenAI(api_key=OPENAI_API_KEY)
+client_openai = openai.OpenAI(api_key=OPENAI_API_KEY, max_retries=0)  # Retries go through request_scheduler
 
 # GitHub API URL for modifying files
 GITHUB_API_URL = f"https://api.github.com/repos/{REPO_NAME}/contents/"
@@ -48,33 +50,25 @@ intents.message_content = True  # ✅ Required for reading messages
 # Define Discord client
 client = discord.Client(intents=intents)
 
-def smart_merge_content(original_content, new_content):
+def smart_merge_content(original_content, new_content, file_path=None):
     """
     Intelligently merge new content with existing content.
-    Tries to add or modify specific parts without completely replacing the file.
+    Python files are merged per top-level definition (see code_merge), so only
+    the functions and statements the model actually returned are touched.
+    Anything that is not Python, or does not parse, is replaced wholesale.
     """
     # If the file is completely empty or very short, just return new content
     if not original_content or len(original_content.split('\n')) < 5:
         return new_content
 
-    # Use difflib to find the best merge strategy
-    differ = difflib.Differ()
-    diff = list(differ.compare(original_content.splitlines(), new_content.splitlines()))
-
-    # Try to identify meaningful changes
-    added_lines = [line[2:] for line in diff if line.startswith('+ ')]
-    removed_lines = [line[2:] for line in diff if line.startswith('- ')]
-
-    # If changes are minimal, append or insert strategically
-    if len(added_lines) < 5:
-        # Append new lines at the end or insert before a specific section
-        if 'if __name__ == "__main__":' in original_content:
-            split_content = original_content.split('if __name__ == "__main__":')
-            return split_content[0] + '\n'.join(added_lines) + '\n\nif __name__ == "__main__":' + split_content[1]
-        else:
-            return original_content + '\n\n# New additions from Discord\n' + '\n'.join(added_lines)
+    if file_path is not None and not file_path.endswith(".py"):
+        return new_content
 
-    return new_content
+    try:
+        return merge_python_source(original_content, new_content)
+    except SyntaxError as e:
+        print(f"⚠️ Structural merge failed for {file_path or 'file'}: {e}. Using new content as-is.")
+        return new_content
 
 @client.event
 async def on_ready():
@@ -110,7 +104,12 @@ async def on_message(message):
     """
 
     try:
-        response = client_openai.chat.completions.create(
+        # The scheduler blocks while it waits for rate limits and backoff; keep that off the event loop
+        response = await asyncio.to_thread(
+            scheduled_call,
+            "openai",
+            client_openai.chat.completions.create,
+            retry_on=OPENAI_RETRYABLE_ERRORS,
             model="gpt-4",
             messages=[{"role": "user", "content": instruction}]
         )
@@ -137,7 +136,9 @@ async def on_message(message):
         for file_path, new_content in updated_files["files"].items():
             # Fetch the current file's content and SHA
             try:
-                file_info = requests.get(GITHUB_API_URL + file_path, headers=headers).json()
+                file_info = (await asyncio.to_thread(
+                    scheduled_request, "github", "GET", GITHUB_API_URL + file_path, headers=headers
+                )).json()
                 current_content = base64.b64decode(file_info.get('content', '')).decode('utf-8')
                 file_sha = file_info.get("sha", None)
             except Exception as e:
@@ -145,7 +146,7 @@ async def on_message(message):
                 file_sha = None
 
             # Smart merge of content
-            merged_content = smart_merge_content(current_content, new_content)
+            merged_content = smart_merge_content(current_content, new_content, file_path)
 
             # Encode content to Base64
             encoded_content = base64.b64encode(merged_content.encode("utf-8")).decode("utf-8")
@@ -157,7 +158,9 @@ async def on_message(message):
                 "sha": file_sha
             }
 
-            response = requests.put(GITHUB_API_URL + file_path, json=update_data, headers=headers)
+            response = await asyncio.to_thread(
+                scheduled_request, "github", "PUT", GITHUB_API_URL + file_path, json=update_data, headers=headers
+            )
 
             if response.status_code in [200, 201]:
                 await message.channel.send(f"✅ {file_path} updated successfully in GitHub!")
@@ -1,12 +1,20 @@
 import streamlit as st
 import os
-import requests
 import openai  # Add this import
-from data_fetching import fetch_stock_data
-from stock_scoring import compute_stock_scores
-from ai_commentary import generate_ai_commentary
+from data_fetching import fetch_stock_data, is_complete_snapshot
+from request_scheduler import OPENAI_RETRYABLE_ERRORS, scheduled_call, scheduled_request
+from stock_scoring import (
+    DEFAULT_THRESHOLDS, DEFAULT_WEIGHTS, FactorSketches, build_factor_matrix, factor_groups, rank_stocks,
+)
+from ai_commentary import cached_ai_commentary
+from shared_cache import shared_cache
+from memory_cache import cache_usage, derived_cache, memory_cache
+from ticker_health import health_report
+import scores_api
 from ui_components import create_stock_recommendation_table, display_top_stocks
 import yfinance as yf
+import pandas as pd
+import time
 
 # Expand Streamlit to full width
 st.set_page_config(layout="wide")
@@ -31,19 +39,117 @@ FRANCE_STOCKS = ['ML.PA', 'ALSTOM.PA', 'DG.PA', 'PUB.PA', 'RNO.PA', 'ACA.PA', 'B
 ASIA_STOCKS = ['9984.T', '700.HK', '005930.KQ', 'RELIANCE.NS', 'BABA', 'TCEHY', 'JD', 'NTES', 'SE', 'SONY']
 US_STOCKS = ['NVDA', 'TSLA', 'PLTR', 'SOFI', 'COIN', 'AMD', 'RBLX', 'UPST', 'CRWD', 'FSLY', 'NET']
 ALL_STOCKS = FRANCE_STOCKS + ASIA_STOCKS + US_STOCKS
+STOCK_REGIONS = {
+    **{stock: "France" for stock in FRANCE_STOCKS},
+    **{stock: "Asia" for stock in ASIA_STOCKS},
+    **{stock: "US" for stock in US_STOCKS},
+}
 
 # Enable auto-refresh
 refresh_interval = st.sidebar.slider("Auto-refresh interval (minutes)", 1, 30, 30)
 
-@st.cache_data(ttl=refresh_interval * 60)
-def fetch_stock_data_cached(stock_list):
-    return fetch_stock_data(stock_list)
+# Chart horizon is resampled from the snapshot's bars, so changing it never refetches
+chart_window = st.sidebar.selectbox("Chart horizon", ["1mo", "3mo", "6mo", "1y", "ytd"], index=2)
+chart_resolution = st.sidebar.selectbox("Bar resolution", ["1d", "1wk", "1mo"], index=0)
 
-# Fetch stock data
-stock_data = fetch_stock_data_cached(ALL_STOCKS)
+# Snapshots with breaker-skipped tickers are not cached, so they last one run rather than a full refresh interval
+@memory_cache(ttl=refresh_interval * 60, max_entries=2, cache_if=is_complete_snapshot)
+@shared_cache(ttl=refresh_interval * 60, lease=600, cache_if=is_complete_snapshot)  # One worker fetches the universe, the others read it
+def fetch_stock_data_cached(stock_list, _on_result=None):
+    # _on_result is left out of the cache key; it only fires on a miss
+    return fetch_stock_data(stock_list, on_result=_on_result)
+
+# Derived values live in the snapshot's own cache entry, so they always match the stock_data shown
+@derived_cache(ttl=refresh_interval * 60, max_entries=1)
+def build_factor_matrix_cached(stock_data):
+    # Built once per data snapshot; weight/threshold changes only re-rank it
+    return build_factor_matrix(stock_data)
+
+@derived_cache(ttl=refresh_interval * 60, max_entries=4)
+def build_factor_percentiles_cached(stock_data, group_by):
+    # Peer-group sketches are rebuilt once per data snapshot, not on every rerun
+    factor_matrix = build_factor_matrix_cached(stock_data)
+    groups = factor_groups(stock_data, factor_matrix.index, by=group_by, regions=STOCK_REGIONS)
+    sketches = FactorSketches()
+    sketches.update(factor_matrix, groups)
+    return sketches.percentiles(factor_matrix, groups)
+
+# Scoring mode -> peer grouping for percentile scoring (None: absolute thresholds)
+SCORING_MODES = {
+    "Absolute thresholds": None,
+    "Percentile within sector": "sector",
+    "Percentile within region": "region",
+}
+
+# Sidebar: factor weights and thresholds (re-ranks the cached factor matrix, no refetch)
+with st.sidebar.expander("⚖️ Scoring Weights & Thresholds", expanded=False):
+    weights = {
+        "momentum": st.slider("Momentum weight", 0.0, 1.0, DEFAULT_WEIGHTS["momentum"], 0.05),
+        "pe": st.slider("P/E weight", 0.0, 1.0, DEFAULT_WEIGHTS["pe"], 0.05),
+        "debt": st.slider("Debt weight", 0.0, 1.0, DEFAULT_WEIGHTS["debt"], 0.05),
+        "roe": st.slider("ROE weight", 0.0, 1.0, DEFAULT_WEIGHTS["roe"], 0.05),
+    }
+    thresholds = {
+        "pe_good": st.number_input("Good P/E below", value=float(DEFAULT_THRESHOLDS["pe_good"]), step=1.0),
+        "pe_ok": st.number_input("Acceptable P/E below", value=float(DEFAULT_THRESHOLDS["pe_ok"]), step=1.0),
+        "debt_good": st.number_input("Good debt/equity below", value=float(DEFAULT_THRESHOLDS["debt_good"]), step=0.1),
+        "debt_ok": st.number_input("Acceptable debt/equity below", value=float(DEFAULT_THRESHOLDS["debt_ok"]), step=0.1),
+        "roe_good": st.number_input("Good ROE above", value=float(DEFAULT_THRESHOLDS["roe_good"]), step=0.01),
+        "roe_ok": st.number_input("Acceptable ROE above", value=float(DEFAULT_THRESHOLDS["roe_ok"]), step=0.01),
+    }
+    top_k = st.number_input("Number of top picks", min_value=1, max_value=10, value=3, step=1)
+    scoring_mode = st.selectbox(
+        "Scoring mode",
+        list(SCORING_MODES),
+        help="Percentile modes rank each factor against the stock's peers; thresholds are then ignored.",
+    )
+    group_by = SCORING_MODES[scoring_mode]
+
+# Fetch stock data, showing progress and a provisional ranking while tickers arrive
+fetch_progress = st.empty()
+provisional_ranking = st.empty()
+received_data = {}
+last_ranking_update = [0.0]
+provisional_sketches = FactorSketches()  # Fed one ticker at a time in percentile modes
+
+def show_fetch_progress(stock, data):
+    received_data[stock] = data
+    if group_by is not None and data is not None:
+        row = build_factor_matrix({stock: data})
+        provisional_sketches.update(row, factor_groups({stock: data}, row.index, by=group_by, regions=STOCK_REGIONS))
+    fetch_progress.progress(
+        len(received_data) / len(ALL_STOCKS),
+        text=f"Fetched {len(received_data)}/{len(ALL_STOCKS)} tickers (latest: {stock})",
+    )
+    # Re-ranking is cheap, but redrawing the table on every ticker isn't; throttle it
+    if time.monotonic() - last_ranking_update[0] < 0.5 and len(received_data) < len(ALL_STOCKS):
+        return
+    last_ranking_update[0] = time.monotonic()
+    partial_factors = build_factor_matrix(received_data)
+    partial_percentiles = None
+    if group_by is not None:
+        partial_groups = factor_groups(received_data, partial_factors.index, by=group_by, regions=STOCK_REGIONS)
+        partial_percentiles = provisional_sketches.percentiles(partial_factors, partial_groups)
+    partial_top = rank_stocks(partial_factors, weights, thresholds, int(top_k), percentiles=partial_percentiles)
+    partial_count = len(partial_factors)
+    with provisional_ranking.container():
+        st.caption(f"⏳ Provisional ranking from {partial_count} scored tickers (updating as data arrives)")
+        if partial_top:
+            st.dataframe(
+                pd.DataFrame(partial_top, columns=["Stock", "Momentum", "P/E Score", "Debt Score", "ROE Score", "Overall"]),
+                hide_index=True,
+                use_container_width=True,
+            )
+
+stock_data = fetch_stock_data_cached(ALL_STOCKS, _on_result=show_fetch_progress)
+fetch_progress.empty()
+provisional_ranking.empty()
+factor_matrix = build_factor_matrix_cached(stock_data)
 
 # Compute stock scores
-computed_scores, valid_stock_count = compute_stock_scores(stock_data)
+factor_percentiles = None if group_by is None else build_factor_percentiles_cached(stock_data, group_by)
+computed_scores = rank_stocks(factor_matrix, weights, thresholds, int(top_k), percentiles=factor_percentiles)
+valid_stock_count = len(factor_matrix)
 top_stocks = computed_scores
 
 # Calculate percentage of valid data
@@ -57,9 +163,38 @@ with st.sidebar.expander("⚠️ Data Warnings & Stats", expanded=False):
     else:
         st.write("✅ All tickers have sufficient data for analysis.")
 
-# Display top 3 stocks with AI commentary
+    usage = cache_usage()
+    st.write(f"🧠 **Cache memory:** {usage['used_bytes'] / 1024 ** 2:.1f} MB of "
+             f"{usage['budget_bytes'] / 1024 ** 2:.0f} MB ({usage['entries']} entries, "
+             f"{usage['evictions']} evictions)")
+
+    health = health_report()
+    for source in health["sources"]:
+        if source["state"] != "closed":
+            st.write(f"🔌 **{source['source']}** circuit breaker is {source['state']} "
+                     f"after {source['failures']} consecutive failures.")
+    if health["tickers"]:
+        st.write("⏸️ **Skipped tickers** (retried automatically with growing intervals):")
+        for entry in health["tickers"]:
+            st.write(f"- {entry['ticker']}: {entry['last_error']} "
+                     f"({entry['failures']} failures, next retry in {entry['retry_in'] / 60:.0f} min)")
+
+# Serve the default-weight ranking as JSON for dashboards and scripts (rebuilt only when the data changes)
+scores_api.start_server()
+
+def build_api_payload():
+    api_top_stocks = rank_stocks(factor_matrix)
+    commentary = {
+        stock: cached_ai_commentary(stock, stock_data[stock]["financials"], (momentum, pe_score, debt_score, roe_score))
+        for stock, momentum, pe_score, debt_score, roe_score, _ in api_top_stocks
+    }
+    return scores_api.build_scores_payload(factor_matrix, api_top_stocks, commentary)
+
+scores_api.publish_snapshot(factor_matrix, build_api_payload)
+
+# Display top stocks with AI commentary
 if top_stocks:
-    display_top_stocks(top_stocks, stock_data, generate_ai_commentary)
+    display_top_stocks(top_stocks, stock_data, cached_ai_commentary, chart_resolution, chart_window)
 else:
     st.write("🚨 No valid stocks available for ranking. Check data sources.")
 
@@ -73,7 +208,10 @@ def test_apis():
             api_results['OpenAI'] = "Error: API Key missing"
         else:
             openai.api_key = OPENAI_API_KEY
-            openai.ChatCompletion.create(
+            scheduled_call(
+                "openai",
+                openai.ChatCompletion.create,
+                retry_on=OPENAI_RETRYABLE_ERRORS,
                 model="gpt-4",
                 messages=[
                     {"role": "system", "content": "Test API functionality."},
@@ -87,14 +225,14 @@ def test_apis():
 
     # Test Yahoo Finance API
     try:
-        yf.Ticker('AAPL').history(period='1d')
+        scheduled_call("yahoo", yf.Ticker('AAPL').history, period='1d')
         api_results['Yahoo Finance'] = "Working"
     except Exception as e:
         api_results['Yahoo Finance'] = f"Error: {str(e)}"
 
     # Test NewsAPI
     try:
-        news_response = requests.get(f'https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}')
+        news_response = scheduled_request("newsapi", "GET", f'https://newsapi.org/v2/top-headlines?country=us&apiKey={NEWS_API_KEY}')
         if news_response.status_code == 200:
             api_results['NewsAPI'] = "Working"
         else:
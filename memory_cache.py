@@ -0,0 +1,325 @@
+import functools
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from shared_cache import make_key
+
+# Total bytes all cached values may occupy in this process
+CACHE_MEMORY_BUDGET = int(float(os.getenv("CACHE_MEMORY_BUDGET_MB", "256")) * 1024 * 1024)
+
+
+def estimate_size(obj, _seen=None):
+    """
+    Estimate how many bytes an object keeps alive.
+
+    DataFrames and Series are measured with ``memory_usage(deep=True)`` so
+    object columns (strings) count in full; containers are walked recursively
+    and shared objects are only counted once.
+
+    Parameters:
+    - obj: Any cached value.
+
+    Returns:
+    - int: Approximate size in bytes.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(estimate_size(item, seen) for item in obj)
+    return sys.getsizeof(obj)
+
+
+class MemoryBudgetCache:
+    """
+    In-process cache that keeps the total estimated size of its values under a byte budget.
+
+    Eviction uses GreedyDual-Size: each entry's priority is the cache's
+    inflation clock plus its recompute cost per byte, refreshed on every hit.
+    The lowest-priority entry goes first, so with equal costs this is plain
+    LRU, while cheap-to-recompute or very large entries are dropped before
+    small expensive ones (e.g. an OpenAI commentary string).
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> {"value", "size", "cost", "expires_at", "priority", "namespace", "derived"}
+        self.owners = {}  # id(value) -> key, to find the entry a derived value belongs to
+        self.used = 0
+        self.clock = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _priority(self, entry):
+        return self.clock + entry["cost"] / max(entry["size"], 1)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.used -= entry["size"]
+        if self.owners.get(id(entry["value"])) == key:
+            del self.owners[id(entry["value"])]
+
+    def _make_room(self, size):
+        """Evict lowest-priority entries until ``size`` more bytes fit in the budget."""
+        while self.used + size > self.budget and self.entries:
+            self._evict(min(self.entries, key=lambda k: self.entries[k]["priority"]))
+
+    def get(self, key):
+        """Return ``(True, value)`` on a live hit, ``(False, None)`` otherwise."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry["expires_at"] <= time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return False, None
+            entry["priority"] = self._priority(entry)
+            self.hits += 1
+            return True, entry["value"]
+
+    def set(self, key, value, ttl, cost, namespace, max_entries=None, size=None):
+        """
+        Store a value, evicting as needed to stay within the budget.
+
+        Values larger than the whole budget are not cached.
+
+        Parameters:
+        - key (str): Cache key.
+        - value: Value to store; callers must treat it as read-only.
+        - ttl (float): Seconds the entry stays valid.
+        - cost (float): Seconds it took to compute the value.
+        - namespace (str): Owning function, for per-function limits and reporting.
+        - max_entries (int): Optional cap on entries for this namespace.
+        - size (int): Bytes to account for the value; estimated when omitted.
+        """
+        size = estimate_size(value) if size is None else size
+        if size > self.budget:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+            now = time.monotonic()
+            for stale in [k for k, e in self.entries.items() if e["expires_at"] <= now]:
+                self._remove(stale)
+
+            if max_entries is not None:
+                same_namespace = [k for k, e in self.entries.items() if e["namespace"] == namespace]
+                while len(same_namespace) >= max_entries:
+                    victim = min(same_namespace, key=lambda k: self.entries[k]["priority"])
+                    same_namespace.remove(victim)
+                    self._evict(victim)
+
+            self._make_room(size)
+
+            entry = {"value": value, "size": size, "cost": cost, "expires_at": now + ttl, "namespace": namespace,
+                     "derived": {}}
+            entry["priority"] = self._priority(entry)
+            self.entries[key] = entry
+            self.owners[id(value)] = key
+            self.used += size
+
+    def get_derived(self, source, key):
+        """Return ``(True, value)`` if a value derived from the cached ``source`` is stored under ``key``."""
+        with self.lock:
+            owner = self.entries.get(self.owners.get(id(source)))
+            derived = owner["derived"].get(key) if owner is not None and owner["value"] is source else None
+            if derived is None or derived["expires_at"] <= time.monotonic():
+                self.misses += 1
+                return False, None
+            owner["priority"] = self._priority(owner)
+            self.hits += 1
+            return True, derived["value"]
+
+    def set_derived(self, source, key, value, ttl, cost, namespace, max_entries=None):
+        """
+        Store a value derived from a cached object inside that object's entry.
+
+        The derived value's size and cost are added to the source's entry, so
+        both are evicted together and count against the budget once. Nothing
+        is stored if the source is not cached here (it was rejected, evicted
+        or came from elsewhere), since there is then no entry to tie it to.
+
+        Parameters:
+        - source: The cached object the value was derived from.
+        - key (str): Key of the derived value within the source's entry.
+        - value: Derived value; callers must treat it as read-only.
+        - ttl (float): Seconds the derived value stays valid (never longer than its source).
+        - cost (float): Seconds it took to compute the value.
+        - namespace (str): Deriving function, for per-function limits and reporting.
+        - max_entries (int): Optional cap on this function's values per source.
+        """
+        size = estimate_size(value)
+        with self.lock:
+            owner_key = self.owners.get(id(source))
+            owner = self.entries.get(owner_key)
+            if owner is None or owner["value"] is not source:
+                return
+
+            derived = owner["derived"]
+            if key in derived:
+                self._drop_derived(owner, key)
+            if max_entries is not None:
+                same_namespace = [k for k, d in derived.items() if d["namespace"] == namespace]
+                for victim in same_namespace[:max(0, len(same_namespace) - max_entries + 1)]:
+                    self._drop_derived(owner, victim)  # Oldest first
+
+            self._make_room(size)
+            if self.entries.get(owner_key) is not owner:
+                return  # The source itself had to go to make room
+
+            derived[key] = {"value": value, "size": size, "cost": cost, "namespace": namespace,
+                            "expires_at": time.monotonic() + ttl}
+            owner["size"] += size
+            owner["cost"] += cost
+            owner["priority"] = self._priority(owner)
+            self.used += size
+
+    def _drop_derived(self, owner, key):
+        derived = owner["derived"].pop(key)
+        owner["size"] -= derived["size"]
+        owner["cost"] -= derived["cost"]
+        self.used -= derived["size"]
+
+    def _evict(self, key):
+        self.clock = self.entries[key]["priority"]
+        self._remove(key)
+        self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.owners.clear()
+            self.used = 0
+
+    def usage(self):
+        """
+        Report current memory usage.
+
+        Returns:
+        - dict: used_bytes, budget_bytes, entries, hits, misses, evictions and
+          by_namespace (namespace -> {"entries", "bytes"}).
+        """
+        with self.lock:
+            by_namespace = {}
+            for entry in self.entries.values():
+                stats = by_namespace.setdefault(entry["namespace"], {"entries": 0, "bytes": 0})
+                stats["entries"] += 1
+                stats["bytes"] += entry["size"]
+                for derived in entry["derived"].values():
+                    # Report derived values under their own function, not the source's
+                    stats["bytes"] -= derived["size"]
+                    derived_stats = by_namespace.setdefault(derived["namespace"], {"entries": 0, "bytes": 0})
+                    derived_stats["entries"] += 1
+                    derived_stats["bytes"] += derived["size"]
+            return {
+                "used_bytes": self.used,
+                "budget_bytes": self.budget,
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "by_namespace": by_namespace,
+            }
+
+
+_cache = MemoryBudgetCache(CACHE_MEMORY_BUDGET)
+
+
+def cache_usage():
+    """Report the process-wide cache's memory usage (see MemoryBudgetCache.usage)."""
+    return _cache.usage()
+
+
+def memory_cache(ttl, max_entries=None, namespace=None, cache_if=None):
+    """
+    Cache a function's results in the process-wide memory-budgeted cache.
+
+    Unlike ``st.cache_data``, entries count against a global byte budget
+    (CACHE_MEMORY_BUDGET_MB) and are evicted by size and recompute cost.
+    Cached values are shared, not copied, so callers must not mutate them.
+
+    Parameters:
+    - ttl (float): Seconds an entry stays valid.
+    - max_entries (int): Optional cap on entries for this function.
+    - namespace (str): Key prefix; defaults to the function's qualified name.
+    - cache_if (callable): Optional predicate on the result; results it rejects are not cached.
+    """
+    def decorator(func):
+        prefix = namespace or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                key = make_key(prefix, args, kwargs)
+            except Exception:
+                return func(*args, **kwargs)  # Unhashable arguments; don't cache
+
+            hit, value = _cache.get(key)
+            if hit:
+                return value
+
+            started = time.monotonic()
+            value = func(*args, **kwargs)
+            if cache_if is None or cache_if(value):
+                _cache.set(key, value, ttl, time.monotonic() - started, prefix, max_entries)
+            return value
+
+        return wrapper
+    return decorator
+
+
+def derived_cache(ttl, max_entries=None, namespace=None):
+    """
+    Cache a value derived from another cached object, for exactly that object.
+
+    The decorated function's first argument is the source (e.g. a data
+    snapshot returned by a ``memory_cache`` function). The derived value is
+    stored inside the source's own cache entry, keyed by the remaining
+    arguments, so it is served only for that very object, counts against the
+    memory budget together with it and is evicted with it. If the source is
+    not in the cache, the value is computed but not kept.
+
+    Parameters:
+    - ttl (float): Seconds an entry stays valid.
+    - max_entries (int): Optional cap on entries for this function per source.
+    - namespace (str): Key prefix; defaults to the function's qualified name.
+    """
+    def decorator(func):
+        prefix = namespace or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(source, *args, **kwargs):
+            try:
+                key = make_key(prefix, args, kwargs)
+            except Exception:
+                return func(source, *args, **kwargs)  # Unhashable arguments; don't cache
+
+            hit, value = _cache.get_derived(source, key)
+            if hit:
+                return value
+
+            started = time.monotonic()
+            value = func(source, *args, **kwargs)
+            _cache.set_derived(source, key, value, ttl, time.monotonic() - started, prefix, max_entries)
+            return value
+
+        return wrapper
+    return decorator
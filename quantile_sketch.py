@@ -0,0 +1,120 @@
+import math
+import random
+
+import numpy as np
+
+
+class KLLSketch:
+    """
+    Mergeable streaming quantile sketch (Karnin-Lang-Liberty).
+
+    Values are kept in a stack of compactors; compactor ``h`` holds items of
+    weight ``2 ** h``. When the sketch is full, the lowest full compactor is
+    sorted and every other item (random offset) is promoted one level up.
+    Memory stays around ``3k`` items regardless of stream length, and rank
+    errors are roughly ``1 / k`` of the stream size. Two sketches built on
+    different shards can be merged into one sketch of the union.
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.rng = random.Random(seed)
+        self.compactors = [[]]
+        self.n = 0
+        self.size = 0
+        self.max_size = 0
+        self._update_max_size()
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _update_max_size(self):
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _compress(self):
+        while self.size >= self.max_size:
+            for height, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(height):
+                    if height + 1 == len(self.compactors):
+                        self.compactors.append([])
+                        self._update_max_size()
+                    items.sort()
+                    offset = self.rng.random() < 0.5
+                    self.compactors[height + 1].extend(items[offset::2])
+                    self.compactors[height] = []
+                    self.size = sum(len(c) for c in self.compactors)
+                    break
+
+    def update(self, value):
+        """Add one value to the sketch."""
+        self.compactors[0].append(float(value))
+        self.n += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def update_many(self, values):
+        """Add every value of an iterable to the sketch."""
+        for value in values:
+            self.update(value)
+
+    def merge(self, other):
+        """
+        Fold another sketch into this one.
+
+        Parameters:
+        - other (KLLSketch): Sketch of another shard of the population.
+        """
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+        self.n += other.n
+        self.size = sum(len(c) for c in self.compactors)
+        self._update_max_size()
+        self._compress()
+
+    def _weighted_items(self):
+        values = np.concatenate([np.asarray(items, dtype=float) for items in self.compactors])
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.compactors)])
+        order = np.argsort(values, kind="stable")
+        return values[order], np.cumsum(weights[order])
+
+    def percentiles(self, values):
+        """
+        Estimate where each value falls in the sketched distribution.
+
+        Ties count half, so a value equal to every item is at the 50th percentile.
+
+        Parameters:
+        - values (array-like): Values to place.
+
+        Returns:
+        - np.ndarray: Fraction of the population below each value, between 0 and 1
+          (NaN for NaN inputs, 0.5 for any other value if the sketch is empty).
+        """
+        values = np.asarray(values, dtype=float)
+        if self.n == 0:
+            return np.where(np.isnan(values), np.nan, 0.5)
+
+        items, cumulative = self._weighted_items()
+        total = cumulative[-1]
+        padded = np.concatenate(([0.0], cumulative))
+        below = padded[np.searchsorted(items, values, side="left")]
+        at_or_below = padded[np.searchsorted(items, values, side="right")]
+        result = (below + at_or_below) / (2 * total)
+        return np.where(np.isnan(values), np.nan, result)
+
+    def quantile(self, q):
+        """
+        Estimate the value at quantile ``q`` (0 to 1).
+
+        Returns:
+        - float: The estimated value (NaN if the sketch is empty).
+        """
+        if self.n == 0:
+            return float("nan")
+        items, cumulative = self._weighted_items()
+        index = np.searchsorted(cumulative, q * cumulative[-1], side="left")
+        return float(items[min(index, len(items) - 1)])
@@ -0,0 +1,214 @@
+import random
+import threading
+import time
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+# Per-provider limits: sustained requests per second, burst size and in-flight cap.
+# Tuned to stay under the free/standard tiers of each API.
+PROVIDER_LIMITS = {
+    "newsapi": {"rate": 1.0, "burst": 5, "concurrency": 2},
+    "yahoo": {"rate": 2.0, "burst": 5, "concurrency": 4},
+    "openai": {"rate": 0.5, "burst": 3, "concurrency": 2},
+    "github": {"rate": 1.0, "burst": 5, "concurrency": 2},
+}
+DEFAULT_LIMITS = {"rate": 1.0, "burst": 2, "concurrency": 2}
+
+MAX_CONCURRENT_REQUESTS = 8  # Across all providers
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5  # Seconds
+BACKOFF_CAP = 30.0  # Seconds
+DEFAULT_TIMEOUT = 10  # Seconds
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# OpenAI SDK errors worth retrying; anything else (bad request, auth) fails fast
+OPENAI_RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+# Exception class names (anywhere in the MRO) that mean a transport failure or
+# rate limiting. Matched by name so the HTTP stacks used by SDKs (requests,
+# curl_cffi, urllib3) are covered without importing each of them.
+TRANSIENT_ERROR_NAMES = {
+    "ConnectionError", "Timeout", "TimeoutError", "ConnectTimeout", "ReadTimeout",
+    "ChunkedEncodingError", "ProtocolError", "YFRateLimitError",
+}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_registry_lock = threading.Lock()
+_buckets = {}
+_provider_slots = {}
+_sessions = {}
+_global_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+
+def _limits(provider):
+    return PROVIDER_LIMITS.get(provider, DEFAULT_LIMITS)
+
+
+def _bucket(provider):
+    with _registry_lock:
+        if provider not in _buckets:
+            limits = _limits(provider)
+            _buckets[provider] = TokenBucket(limits["rate"], limits["burst"])
+            _provider_slots[provider] = threading.BoundedSemaphore(limits["concurrency"])
+        return _buckets[provider]
+
+
+def get_session(provider):
+    """
+    Return the shared keep-alive session for a provider.
+
+    Parameters:
+    - provider (str): Provider name, e.g. "newsapi" or "github".
+
+    Returns:
+    - requests.Session: A session whose connection pool is sized to the provider's concurrency cap.
+    """
+    with _registry_lock:
+        if provider not in _sessions:
+            pool_size = _limits(provider)["concurrency"]
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[provider] = session
+        return _sessions[provider]
+
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Compute how long to wait before the next attempt.
+
+    Uses exponential backoff with full jitter, unless the server told us
+    exactly how long to wait via ``Retry-After``.
+
+    Parameters:
+    - attempt (int): Zero-based retry number.
+    - retry_after (str | None): Value of the Retry-After header, if any.
+
+    Returns:
+    - float: Delay in seconds.
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_CAP)
+        except ValueError:
+            pass  # HTTP-date form; fall back to our own schedule
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def is_transient_error(error):
+    """
+    Decide whether an SDK error is worth retrying.
+
+    Network failures, timeouts and HTTP 429/5xx responses are transient; bad
+    symbols, missing fields (KeyError) and other 4xx responses are not, and
+    retrying them only burns the provider's rate budget.
+
+    Parameters:
+    - error (Exception): The error raised by the call.
+
+    Returns:
+    - bool: True if the call may succeed when retried.
+    """
+    if any(cls.__name__ in TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in RETRY_STATUS_CODES
+
+
+def _run_with_slot(provider, func, *args, **kwargs):
+    _bucket(provider).acquire()
+    with _global_slots, _provider_slots[provider]:
+        return func(*args, **kwargs)
+
+
+def scheduled_request(provider, method, url, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Send an HTTP request through the provider's rate limiter and pooled session.
+
+    Connection errors, timeouts and retryable status codes (429, 5xx) are
+    retried with jittered exponential backoff.
+
+    Parameters:
+    - provider (str): Provider name used for rate limiting and session pooling.
+    - method (str): HTTP method, e.g. "GET".
+    - url (str): Request URL.
+    - max_retries (int): Retries after the first attempt.
+    - **kwargs: Passed through to ``requests.Session.request``.
+
+    Returns:
+    - requests.Response: The final response (possibly still an error status once retries are exhausted).
+
+    Raises:
+    - requests.RequestException: If the last attempt fails at the connection level.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    session = get_session(provider)
+
+    for attempt in range(max_retries + 1):
+        try:
+            response = _run_with_slot(provider, session.request, method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status_code not in RETRY_STATUS_CODES or attempt == max_retries:
+            return response
+        time.sleep(backoff_delay(attempt, response.headers.get("Retry-After")))
+
+
+def scheduled_call(provider, func, *args, retry_on=is_transient_error, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Run an SDK call (yfinance, OpenAI) under the provider's rate limit and concurrency cap.
+
+    Parameters:
+    - provider (str): Provider name used for rate limiting.
+    - func (callable): The call to make.
+    - *args: Positional arguments for ``func``.
+    - retry_on (tuple | callable): Exception types that should be retried with backoff,
+      or a predicate taking the exception (default: is_transient_error).
+    - max_retries (int): Retries after the first attempt.
+    - **kwargs: Keyword arguments for ``func``.
+
+    Returns:
+    - Any: Whatever ``func`` returns.
+
+    Raises:
+    - Exception: The last error from ``func`` once retries are exhausted, or any non-retryable error.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return _run_with_slot(provider, func, *args, **kwargs)
+        except Exception as e:
+            retryable = isinstance(e, retry_on) if isinstance(retry_on, tuple) else retry_on(e)
+            if not retryable or attempt == max_retries:
+                raise
+            time.sleep(backoff_delay(attempt))
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import math
+import os
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from stock_scoring import score_factor_matrix
+
+SCORES_API_PORT = int(os.getenv("SCORES_API_PORT", "8502"))
+
+_lock = threading.Lock()
+_snapshot = None  # {"body": bytes, "etag": str, "last_modified": datetime, "last_modified_header": str}
+_snapshot_source = None  # Object the current snapshot was built from
+_server = None
+
+
+def _json_number(value):
+    """Return a number as-is, or None for NaN/inf, which JSON cannot represent."""
+    return value if math.isfinite(value) else None
+
+
+def _records(df):
+    """Convert a DataFrame to {index: {column: value}} with NaN and inf as null."""
+    valid = pd.notna(df) & ~df.isin([math.inf, -math.inf])
+    return df.astype(object).where(valid, None).to_dict(orient="index")
+
+
+def build_scores_payload(factor_matrix, top_stocks, commentary):
+    """
+    Assemble the JSON document served by the endpoint.
+
+    Parameters:
+    - factor_matrix (pd.DataFrame): Raw factors from build_factor_matrix.
+    - top_stocks (list): Ranked tuples from rank_stocks.
+    - commentary (dict): Ticker -> AI commentary for the top stocks.
+
+    Returns:
+    - dict: JSON-serialisable payload.
+    """
+    scores = score_factor_matrix(factor_matrix)
+    return {
+        "top_stocks": [
+            {
+                "stock": stock,
+                "momentum": _json_number(momentum),
+                "pe_score": _json_number(pe_score),
+                "debt_score": _json_number(debt_score),
+                "roe_score": _json_number(roe_score),
+                "overall": _json_number(overall),
+                "commentary": commentary.get(stock),
+            }
+            for stock, momentum, pe_score, debt_score, roe_score, overall in top_stocks
+        ],
+        "factors": _records(factor_matrix),
+        "scores": _records(scores),
+        "valid_stock_count": len(factor_matrix),
+    }
+
+
+def publish_snapshot(source, build_payload):
+    """
+    Publish a new snapshot if the underlying data changed.
+
+    The payload is only built and serialised when ``source`` is a different
+    object from the one the current snapshot came from, so calling this on
+    every Streamlit rerun is cheap. The ETag is a hash of the body, so a
+    refresh that yields identical content keeps the same ETag and
+    Last-Modified.
+
+    Parameters:
+    - source: The data snapshot the payload derives from (e.g. the factor matrix).
+    - build_payload (callable): Returns the payload dict.
+    """
+    global _snapshot, _snapshot_source
+    with _lock:
+        if source is _snapshot_source:
+            return
+
+    # allow_nan=False: a NaN slipping through must fail loudly rather than emit invalid JSON
+    body = json.dumps(build_payload(), default=str, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+    with _lock:
+        _snapshot_source = source
+        if _snapshot is not None and _snapshot["etag"] == etag:
+            return
+        # HTTP dates have one-second resolution
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        _snapshot = {
+            "body": body,
+            "etag": etag,
+            "last_modified": now,
+            "last_modified_header": format_datetime(now, usegmt=True),
+        }
+
+
+class ScoresRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the latest snapshot at /scores, honouring If-None-Match and If-Modified-Since.
+
+    Snapshots are published by the Streamlit script run (main.py), which is
+    also what fetches the data: until the dashboard has been opened once
+    after a start, and between refreshes nobody triggers, the endpoint
+    answers 503 or keeps serving the last snapshot. Keep one client (or a
+    health check) loading the page to keep it fresh.
+    """
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/scores", "/scores/"):
+            self.send_error(404)
+            return
+
+        snapshot = _snapshot
+        if snapshot is None:
+            # Nothing published yet: the dashboard has not run since the process started
+            body = b'{"error":"no snapshot yet; open the dashboard to trigger the first fetch"}'
+            self.send_response(503)
+            self.send_header("Retry-After", "30")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if self._not_modified(snapshot):
+            self.send_response(304)
+            self.send_header("ETag", snapshot["etag"])
+            self.send_header("Last-Modified", snapshot["last_modified_header"])
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(snapshot["body"])))
+        self.send_header("ETag", snapshot["etag"])
+        self.send_header("Last-Modified", snapshot["last_modified_header"])
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(snapshot["body"])
+
+    def _not_modified(self, snapshot):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or snapshot["etag"] in tags
+
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is not None:
+            try:
+                return snapshot["last_modified"] <= parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def log_message(self, format, *args):
+        pass  # Polling clients would flood the Streamlit logs
+
+
+def start_server(port=SCORES_API_PORT):
+    """
+    Start the scores endpoint in a background thread, once per process.
+
+    Parameters:
+    - port (int): Port to listen on.
+    """
+    global _server
+    with _lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer(("0.0.0.0", port), ScoresRequestHandler)
+        except OSError as e:
+            print(f"⚠️ Scores API not started on port {port}: {e}")
+            _server = False
+            return
+    threading.Thread(target=_server.serve_forever, name="scores-api", daemon=True).start()
+    print(f"✅ Scores API listening on port {port} (/scores)")
@@ -0,0 +1,261 @@
+import re
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Tokenisation mirrors pattern's find_tokens, which TextBlob's sentiment uses.
+# Contractions are split off and every quote/apostrophe becomes its own token,
+# so "isn't" reads as "is n ' t" and (as in TextBlob) never negates.
+CONTRACTIONS = ("'d", "'m", "'s", "'ll", "'re", "'ve", "n't")
+QUOTES = ("\u201c", "\u201d", "\u2018", "\u2019", "'", '"')
+PUNCTUATION = tuple(",;:!?()[]{}`'\"@#$^&*+-|=~_")  # Split from either end of a word
+ABBREVIATION_PATTERNS = (
+    re.compile(r"^[A-Za-z]\.$"),
+    re.compile(r"^([A-Za-z]\.)+$"),
+    re.compile(r"^[A-Z][b|c|d|f|g|h|j|k|l|m|n|p|q|r|s|t|v|w|x|z]+.$"),
+)
+
+NEGATION_PENALTY = -0.5  # "not good" = slightly bad, as in TextBlob
+EXCLAMATION_BOOST = 1.25
+
+_lexicon_lock = threading.Lock()
+_lexicon = None
+
+
+def load_lexicon():
+    """
+    Build array lookups from TextBlob's bundled sentiment lexicon (loaded once).
+
+    Returns:
+    - dict: vocab (word -> id), polarity, intensity and is_modifier arrays indexed
+      by id, the negation words and the tokenizer's abbreviations.
+    """
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            from textblob._text import ABBREVIATIONS
+            from textblob.en import sentiment as pattern_sentiment
+
+            pattern_sentiment.load()
+            words = sorted(pattern_sentiment.keys())
+            polarity = np.empty(len(words))
+            intensity = np.empty(len(words))
+            is_modifier = np.zeros(len(words), dtype=bool)
+            for idx, word in enumerate(words):
+                senses = pattern_sentiment[word]
+                polarity[idx], _, intensity[idx] = senses[None]  # Averaged over parts of speech
+                is_modifier[idx] = any(pos in senses for pos in pattern_sentiment.modifiers)
+            _lexicon = {
+                "vocab": {word: idx for idx, word in enumerate(words)},
+                "polarity": polarity,
+                "intensity": intensity,
+                "is_modifier": is_modifier,
+                "negations": set(pattern_sentiment.negations),
+                "abbreviations": set(ABBREVIATIONS),
+            }
+        return _lexicon
+
+
+def _is_abbreviation(word, abbreviations):
+    return word in abbreviations or any(pattern.match(word) for pattern in ABBREVIATION_PATTERNS)
+
+
+def tokenize(text):
+    """
+    Split a text into lower-case tokens the way TextBlob's sentiment analyzer sees them.
+
+    Leading and trailing punctuation, ellipses and sentence periods (but not
+    abbreviations) are split from words; punctuation inside a word stays.
+    """
+    text = text or ""
+    for contraction in CONTRACTIONS:
+        text = text.replace(contraction, " " + contraction)
+    for quote in QUOTES:
+        text = text.replace(quote, f" {quote} ")
+
+    abbreviations = load_lexicon()["abbreviations"]
+    tokens = []
+    for chunk in text.split():
+        if chunk.isalnum():
+            tokens.append(chunk.lower())  # Fast path for plain words
+            continue
+        while chunk.startswith(PUNCTUATION):
+            tokens.append(chunk[0])
+            chunk = chunk[1:]
+        tail = []
+        while chunk.endswith(PUNCTUATION + (".",)):
+            if chunk.endswith(PUNCTUATION):
+                tail.append(chunk[-1])
+                chunk = chunk[:-1]
+            if chunk.endswith("..."):
+                tail.append("...")
+                chunk = chunk[:-3].rstrip(".")
+            if chunk.endswith("."):
+                if _is_abbreviation(chunk, abbreviations):
+                    break
+                tail.append(".")
+                chunk = chunk[:-1]
+        if chunk:
+            tokens.append(chunk.lower())
+        tokens.extend(reversed(tail))
+    return tokens
+
+
+def _last_before(mask, positions, doc_start):
+    """Position of the latest token matching ``mask`` strictly before each token in the same text, or -1."""
+    upto = np.maximum.accumulate(np.where(mask, positions, -1))
+    before = np.concatenate(([-1], upto[:-1]))
+    return np.where(before >= doc_start, before, -1)
+
+
+def batch_polarity(texts):
+    """
+    Score a batch of texts at once, reproducing TextBlob's polarity.
+
+    All tokens of the batch are mapped to lexicon ids in one pass; TextBlob's
+    left-to-right rules are then evaluated as array operations over the token
+    stream ("latest modifier/negation before each word" via running maxima),
+    and per-text scores come from a weighted ``bincount``, i.e. a sparse
+    (texts x assessments) matrix times the score vector. The rules covered:
+
+    - a modifier ("very good") merges with the next known word within two-letter words;
+    - a negation ("not good", "not a good") flips the assessment to -0.5x and
+      inverts the intensity it passes on ("not very good");
+    - "really not good" negates the "-ly" modifier's assessment;
+    - exclamation marks boost the latest assessment by 1.25x.
+
+    Texts without any lexicon word score 0. Emoticons and the "(!)" sarcasm
+    marker are not scored, so texts containing them can differ from
+    ``TextBlob(text).sentiment.polarity``; everything else matches it.
+
+    Parameters:
+    - texts (list): Strings to score (None is treated as empty).
+
+    Returns:
+    - np.ndarray: Polarity per text, between -1 and 1.
+    """
+    if len(texts) == 0:
+        return np.zeros(0)
+
+    lexicon = load_lexicon()
+    vocab, negations = lexicon["vocab"], lexicon["negations"]
+
+    ids, docs, negation, exclamation, lengths, stripped_lengths, ly = [], [], [], [], [], [], []
+    for doc, text in enumerate(texts):
+        for token in tokenize(text):
+            ids.append(vocab.get(token, -1))
+            docs.append(doc)
+            negation.append(token in negations)
+            exclamation.append(token == "!")
+            lengths.append(len(token))
+            stripped_lengths.append(len(token.strip("'")))
+            ly.append(token.endswith("ly"))
+    if not ids:
+        return np.zeros(len(texts))
+
+    ids = np.array(ids)
+    docs = np.array(docs)
+    negation = np.array(negation)
+    exclamation = np.array(exclamation)
+    lengths = np.array(lengths)
+    stripped_lengths = np.array(stripped_lengths)
+    ly = np.array(ly)
+
+    positions = np.arange(len(ids))
+    doc_start = np.maximum.accumulate(np.where(np.concatenate(([True], docs[1:] != docs[:-1])), positions, 0))
+
+    known = ids >= 0
+    if not known.any():
+        return np.zeros(len(texts))
+    safe_ids = np.where(known, ids, 0)
+    polarity = np.where(known, lexicon["polarity"][safe_ids], 0.0)
+    intensity = np.where(known, lexicon["intensity"][safe_ids], 1.0)
+    modifier = known & lexicon["is_modifier"][safe_ids]
+
+    prev_known = _last_before(known, positions, doc_start)
+    safe_prev = np.maximum(prev_known, 0)
+    after_ly_modifier = (prev_known >= 0) & modifier[safe_prev] & ly[safe_prev]
+
+    # A modifier carries over unknown words of up to two letters ("really is good");
+    # after an "-ly" modifier a negation doesn't break it ("really not good")
+    modifier_reset = ~known & (lengths > 2) & ~(negation & after_ly_modifier)
+    modifier_active = (prev_known >= 0) & modifier[safe_prev] & (
+        _last_before(modifier_reset, positions, doc_start) < prev_known
+    )
+    ly_negation = ~known & negation & modifier_active & ly[safe_prev]
+
+    # A negation carries over unknown single-letter words ("not a good"); a known
+    # negation word applies to the next word, so it wins a tie with itself
+    negation_source = negation & ~ly_negation
+    negation_reset = known | (~known & ~negation & (stripped_lengths > 1)) | ly_negation
+    last_negation = _last_before(negation_source, positions, doc_start)
+    negated = known & (last_negation >= 0) & (last_negation >= _last_before(negation_reset, positions, doc_start))
+
+    # A known word after an active modifier joins the modifier's assessment
+    merged = known & modifier_active
+    assessment = np.cumsum(known & ~merged) - 1  # Assessment id of each known word
+    known_assessments = assessment[known]
+    is_final = np.zeros(len(ids), dtype=bool)
+    is_final[known] = np.concatenate((known_assessments[1:] != known_assessments[:-1], [True]))
+
+    # An assessment's score comes from its last word, scaled by the intensity passed on
+    # by the word before it (inverted if that word was negated)
+    passed_intensity = np.where(negated, 1.0 / intensity, intensity)
+    finals = positions[is_final]
+    scores = np.where(merged[finals], np.clip(polarity[finals] * passed_intensity[prev_known[finals]], -1.0, 1.0),
+                      polarity[finals])
+
+    # Exclamation marks boost the latest assessment, unless a later word merges into it
+    boosted_word = prev_known[exclamation]
+    boosted_word = boosted_word[boosted_word >= 0]
+    boosted_word = boosted_word[is_final[boosted_word]]
+    n_assessments = len(finals)
+    boosts = np.bincount(assessment[boosted_word], minlength=n_assessments)
+    scores = np.clip(scores * EXCLAMATION_BOOST ** boosts, -1.0, 1.0)
+
+    # Any negation inside an assessment (or after its "-ly" modifier) flips it
+    negation_hits = np.bincount(assessment[positions[negated]], minlength=n_assessments) \
+        + np.bincount(assessment[prev_known[ly_negation]], minlength=n_assessments)
+    scores = np.where(negation_hits > 0, scores * NEGATION_PENALTY, scores)
+
+    totals = np.bincount(docs[finals], weights=scores, minlength=len(texts))
+    counts = np.bincount(docs[finals], minlength=len(texts))
+    return totals / np.maximum(counts, 1)
+
+
+def aggregate_sentiment(scores, published_at=None, half_life_hours=None):
+    """
+    Combine per-article polarities into one sentiment score.
+
+    Parameters:
+    - scores (array-like): Polarity per article.
+    - published_at (list): ISO-8601 publication times (NewsAPI ``publishedAt``), same order as scores.
+    - half_life_hours (float): If set, weight each article by 0.5 ** (age / half_life)
+      instead of taking a plain mean.
+
+    Returns:
+    - float: Aggregate sentiment between -1 and 1 (0 if there are no articles).
+    """
+    scores = np.asarray(scores, dtype=float)
+    if scores.size == 0:
+        return 0
+
+    if not half_life_hours or published_at is None:
+        return float(scores.mean())
+
+    now = datetime.now(timezone.utc)
+    ages = []
+    for stamp in published_at:
+        try:
+            published = datetime.fromisoformat((stamp or "").replace("Z", "+00:00"))
+            ages.append(max((now - published).total_seconds() / 3600, 0))
+        except (TypeError, ValueError):
+            ages.append(np.nan)
+    ages = np.array(ages)
+    # Articles without a usable timestamp count as the oldest one we have
+    ages = np.where(np.isnan(ages), np.nanmax(ages) if not np.all(np.isnan(ages)) else 0, ages)
+    # Ages relative to the newest article: same relative weights, but the newest
+    # always weighs 1, so very old batches cannot underflow to all-zero weights
+    weights = 0.5 ** ((ages - ages.min()) / half_life_hours)
+    return float(np.average(scores, weights=weights))
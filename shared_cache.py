@@ -0,0 +1,270 @@
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import stat
+import threading
+import time
+import uuid
+
+# Where the cache lives. Point every Streamlit worker at the same location:
+#   sqlite:////var/lib/fingpt/cache.db  (workers on one host; the file must be owned by this user)
+#   redis://host:6379/0                 (workers on several hosts; any Redis-compatible server)
+#   none                                (default; process-local caching only)
+# Entries are unpickled on read, so only point this at storage no other user can write.
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "none")
+
+LOCK_LEASE = 120  # Seconds a filler may hold an entry before others may take over
+POLL_INTERVAL = 0.25  # Seconds between checks while another worker fills an entry
+
+
+def _check_private_file(path):
+    """
+    Create the cache file if needed and make sure no other user can write it.
+
+    Raises:
+    - OSError: If the path is a symlink.
+    - PermissionError: If the file is owned by someone else or is group/world writable.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        info = os.fstat(fd)
+    finally:
+        os.close(fd)
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by uid {info.st_uid}, not this user")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{path} is writable by other users")
+
+
+class SQLiteBackend:
+    """
+    Cache backend on a SQLite file, shared by processes on the same host.
+
+    The file runs in WAL mode, which relies on shared memory and does not
+    work on network filesystems; workers on several hosts need Redis.
+    """
+
+    def __init__(self, path):
+        _check_private_file(path)
+        self.path = path
+        self.local = threading.local()
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT, expires_at REAL)")
+
+    def _connect(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        # Keys change every refresh (e.g. commentary per score tuple); drop expired rows so the file stays bounded
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), now + ttl),
+        )
+
+    def acquire(self, key, owner, lease):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)", (key, owner, now + lease)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def release(self, key, owner):
+        self._connect().execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, owner))
+
+    def locked(self, key):
+        row = self._connect().execute(
+            "SELECT 1 FROM locks WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+
+class RedisBackend:
+    """Cache backend on any Redis-compatible server."""
+
+    # Only delete the lock if we still own it
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url):
+        import redis  # Optional dependency, only needed for redis:// URLs
+
+        self.client = redis.Redis.from_url(url)
+        self.release_lock = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def acquire(self, key, owner, lease):
+        return bool(self.client.set(f"lock:{key}", owner, nx=True, px=int(lease * 1000)))
+
+    def release(self, key, owner):
+        self.release_lock(keys=[f"lock:{key}"], args=[owner])
+
+    def locked(self, key):
+        return bool(self.client.exists(f"lock:{key}"))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    Return the process-wide cache backend configured by SHARED_CACHE_URL.
+
+    Returns:
+    - SQLiteBackend | RedisBackend | None: None when shared caching is disabled or unavailable.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            try:
+                if SHARED_CACHE_URL.startswith("redis://") or SHARED_CACHE_URL.startswith("rediss://"):
+                    _backend = RedisBackend(SHARED_CACHE_URL)
+                elif SHARED_CACHE_URL.startswith("sqlite:///"):
+                    _backend = SQLiteBackend(SHARED_CACHE_URL[len("sqlite:///"):])
+                else:
+                    _backend = False
+            except Exception as e:
+                print(f"⚠️ Shared cache unavailable ({SHARED_CACHE_URL}): {e}. Falling back to local caching.")
+                _backend = False
+        return _backend or None
+
+
+def make_key(namespace, args, kwargs):
+    """
+    Build a cache key from a namespace and the call arguments.
+
+    Like ``st.cache_data``, keyword arguments whose name starts with an
+    underscore (callbacks, UI handles) are left out of the key.
+    """
+    hashed_kwargs = sorted((k, v) for k, v in kwargs.items() if not k.startswith("_"))
+    digest = hashlib.sha256(pickle.dumps((args, hashed_kwargs))).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def get_or_compute(backend, key, compute, ttl, lease=LOCK_LEASE, cache_if=None):
+    """
+    Read an entry from the shared cache, or fill it if this worker wins the lock.
+
+    Workers that lose the lock wait for the winner to publish the value. If the
+    winner dies, its lease expires and the next worker takes over; if it
+    releases the lock without publishing (``cache_if`` rejected the value),
+    the next worker computes its own.
+
+    Parameters:
+    - backend: A cache backend.
+    - key (str): Cache key.
+    - compute (callable): Produces the value on a miss.
+    - ttl (float): Seconds the entry stays valid.
+    - lease (float): Seconds a filler may hold the lock.
+    - cache_if (callable): Optional predicate; values it rejects are returned but not stored.
+
+    Returns:
+    - Any: The cached or freshly computed value.
+    """
+    owner = uuid.uuid4().hex
+    while True:
+        cached = backend.get(key)
+        if cached is not None:
+            return pickle.loads(cached)
+
+        if backend.acquire(key, owner, lease):
+            try:
+                # Another worker may have filled it between our read and our lock
+                cached = backend.get(key)
+                if cached is not None:
+                    return pickle.loads(cached)
+                value = compute()
+                if cache_if is not None and not cache_if(value):
+                    return value
+                try:
+                    backend.set(key, pickle.dumps(value), ttl)
+                except (pickle.PicklingError, TypeError, AttributeError) as e:
+                    print(f"⚠️ Value for {key} cannot be shared across workers: {e}")
+                return value
+            finally:
+                backend.release(key, owner)
+
+        # Someone else is filling it; wait for them (or for their lease to lapse)
+        deadline = time.monotonic() + lease
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            if backend.get(key) is not None or not backend.locked(key):
+                break
+
+
+def shared_cache(ttl, namespace=None, lease=LOCK_LEASE, cache_if=None):
+    """
+    Cache a function's results across processes so exactly one worker computes each entry.
+
+    Falls back to calling the function directly if the shared backend is
+    disabled or errors.
+
+    Parameters:
+    - ttl (float): Seconds an entry stays valid.
+    - namespace (str): Key prefix; defaults to the function's qualified name.
+    - lease (float): Seconds a filler may hold an entry's lock.
+    - cache_if (callable): Optional predicate on the result; results it rejects
+      (errors, degraded data) are returned but never shared.
+    """
+    def decorator(func):
+        prefix = namespace or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_backend()
+            if backend is None:
+                return func(*args, **kwargs)
+            try:
+                key = make_key(prefix, args, kwargs)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                return func(*args, **kwargs)  # Unhashable arguments; nothing to share
+
+            started, result = [], []
+
+            def compute():
+                started.append(True)
+                result.append(func(*args, **kwargs))
+                return result[0]
+
+            try:
+                return get_or_compute(backend, key, compute, ttl, lease, cache_if)
+            except Exception as e:
+                if result:
+                    return result[0]  # Backend failed after we computed; the value is still good
+                if started:
+                    raise  # The function itself failed
+                print(f"⚠️ Shared cache error for {prefix}: {e}")
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -1,47 +1,247 @@
+import numpy as np
 import pandas as pd
 
-def compute_stock_scores(stock_data):
+from quantile_sketch import KLLSketch
+
+FACTORS = ["momentum", "pe", "debt", "roe"]
+
+MIN_PRICE_BARS = 20  # Stocks with fewer bars are not scored
+
+# Raw factor column behind each score, and whether a higher raw value is better
+FACTOR_COLUMNS = {
+    "momentum": ("momentum", True),
+    "pe": ("pe_ratio", False),
+    "debt": ("debt_equity", False),
+    "roe": ("return_on_equity", True),
+}
+
+# Values assumed for missing raw factors under absolute thresholds (average P/E, D/E of 1).
+# Percentile scoring leaves them out of the peer distributions instead.
+MISSING_FACTOR_DEFAULTS = {"momentum": 0, "pe_ratio": 15, "debt_equity": 1, "return_on_equity": 0}
+
+# Percentile scoring: groups smaller than this are ranked against the whole universe
+MIN_GROUP_SIZE = 3
+ALL_GROUP = "__all__"
+
+# Equal weights reproduce the original (momentum + pe + debt + roe) / 4 score
+DEFAULT_WEIGHTS = {"momentum": 0.25, "pe": 0.25, "debt": 0.25, "roe": 0.25}
+
+DEFAULT_THRESHOLDS = {
+    "momentum_cap": 10,  # Momentum score is clipped to [0, cap]
+    "pe_good": 15,  # P/E below this scores 10
+    "pe_ok": 30,  # P/E below this scores 4
+    "debt_good": 1,  # Debt/equity below this scores 10
+    "debt_ok": 2,  # Debt/equity below this scores 4
+    "roe_good": 0.15,  # ROE above this scores 10
+    "roe_ok": 0.05,  # ROE above this scores 4
+}
+
+def build_factor_matrix(stock_data):
     """
-    Compute stock scores based on momentum, RSI, and volume.
+    Extract the raw factor values for every scorable stock.
+
+    This is the only pass over the price data. Run it once per data snapshot
+    and re-rank its output with rank_stocks when weights or thresholds change.
 
     Parameters:
     stock_data (dict): A dictionary containing stock data.
 
     Returns:
-    tuple: A tuple containing a list of tuples with stock data and the count of valid stocks.
+    pd.DataFrame: One row per stock with at least MIN_PRICE_BARS bars, columns
+    momentum, pe_ratio, debt_equity and return_on_equity (NaN where missing).
     """
-    scores = []
+    rows = {}
     for stock, data in stock_data.items():
-        if data is None or "price_data" not in data or len(data["price_data"]) < 20:
+        if data is None or "price_data" not in data or len(data["price_data"]) < MIN_PRICE_BARS:
             continue
 
         price_data = data["price_data"]
         financials = data.get("financials", {})  # Ensure financials exist
 
-        # Ensure data integrity with null checks
-        volume = price_data.get('Volume', pd.Series([0])).fillna(0).iloc[-1] if "Volume" in price_data else 0
-        momentum = price_data["Close"].pct_change().iloc[-1] * 100 if "Close" in price_data else 0
-        
-        # Add null checks for financial metrics
-        pe_ratio = financials.get("pe_ratio")
-        if pe_ratio is None:
-            pe_ratio = 15  # Default to average P/E if missing
-        debt_equity = financials.get("debt_equity")
-        if debt_equity is None:
-            debt_equity = 1  # Default to 1 if missing
-        roe = financials.get("return_on_equity")
-        if roe is None:
-            roe = 0  # Default to 0 if missing
-
-        # Scoring logic (higher is better)
-        momentum_score = min(max(momentum, 0), 10)
-        pe_score = 10 if pe_ratio < 15 else 4 if pe_ratio < 30 else 0  # Low P/E is better
-        debt_score = 10 if debt_equity < 1 else 4 if debt_equity < 2 else 0
-        roe_score = 10 if roe > 0.15 else 4 if roe > 0.05 else 0
-
-        overall_score = (momentum_score + pe_score + debt_score + roe_score) / 4
-
-        scores.append((stock, momentum_score, pe_score, debt_score, roe_score, overall_score))
-
-    scores = sorted(scores, key=lambda x: x[-1], reverse=True)
-    return scores[:3], len(scores)  # Ensure only top 3 are returned and valid stock count is included
+        momentum = price_data["Close"].pct_change().iloc[-1] * 100 if "Close" in price_data else None
+
+        # Missing values stay NaN here; each scoring mode decides how to treat them
+        rows[stock] = (
+            momentum,
+            financials.get("pe_ratio"),
+            financials.get("debt_equity"),
+            financials.get("return_on_equity"),
+        )
+
+    return pd.DataFrame.from_dict(
+        rows, orient="index", columns=["momentum", "pe_ratio", "debt_equity", "return_on_equity"], dtype=float
+    )
+
+def score_factor_matrix(factors, weights=None, thresholds=None):
+    """
+    Turn raw factor values into 0-10 factor scores and a weighted overall score.
+
+    Parameters:
+    factors (pd.DataFrame): Output of build_factor_matrix.
+    weights (dict): Weight per factor (momentum, pe, debt, roe); normalised to sum to 1.
+    thresholds (dict): Overrides for DEFAULT_THRESHOLDS.
+
+    Returns:
+    pd.DataFrame: Columns momentum, pe, debt, roe and overall, indexed like ``factors``.
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    t = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    factors = factors.fillna(MISSING_FACTOR_DEFAULTS)
+
+    # Scoring logic (higher is better)
+    scores = pd.DataFrame(index=factors.index)
+    scores["momentum"] = factors["momentum"].clip(lower=0, upper=t["momentum_cap"])
+    pe, debt, roe = factors["pe_ratio"].to_numpy(), factors["debt_equity"].to_numpy(), factors["return_on_equity"].to_numpy()
+    scores["pe"] = np.select([pe < t["pe_good"], pe < t["pe_ok"]], [10, 4], 0)  # Low P/E is better
+    scores["debt"] = np.select([debt < t["debt_good"], debt < t["debt_ok"]], [10, 4], 0)
+    scores["roe"] = np.select([roe > t["roe_good"], roe > t["roe_ok"]], [10, 4], 0)
+
+    scores["overall"] = _weighted_overall(scores, weights)
+    return scores
+
+def _weighted_overall(scores, weights):
+    """Weighted sum of the factor scores, with weights normalised to sum to 1."""
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    weight_vector = np.array([weights[f] for f in FACTORS], dtype=float)
+    total = weight_vector.sum()
+    weight_vector = weight_vector / total if total > 0 else np.full(len(FACTORS), 1 / len(FACTORS))
+    return scores[FACTORS].to_numpy() @ weight_vector
+
+def factor_groups(stock_data, index, by="sector", regions=None):
+    """
+    Label each stock with the peer group it is ranked against.
+
+    Parameters:
+    stock_data (dict): A dictionary containing stock data.
+    index (pd.Index): Stocks to label (usually the factor matrix index).
+    by (str): "sector" (from the financials) or "region".
+    regions (dict): Ticker -> region name, required when by="region".
+
+    Returns:
+    pd.Series: Group name per stock ("Unknown" when missing).
+    """
+    if by == "region":
+        labels = [(regions or {}).get(stock) for stock in index]
+    else:
+        labels = [((stock_data.get(stock) or {}).get("financials") or {}).get("sector") for stock in index]
+    return pd.Series([label or "Unknown" for label in labels], index=index)
+
+class FactorSketches:
+    """
+    Streaming quantile sketches of every raw factor, per peer group and for the whole universe.
+
+    Sketches can be fed incrementally (e.g. as tickers arrive) and merged
+    across shards, so percentiles never require sorting the full population.
+    """
+
+    def __init__(self, k=200):
+        self.k = k
+        self.sketches = {}  # (group, column) -> KLLSketch
+
+    def _sketch(self, group, column):
+        if (group, column) not in self.sketches:
+            self.sketches[(group, column)] = KLLSketch(self.k)
+        return self.sketches[(group, column)]
+
+    def update(self, factors, groups):
+        """
+        Add stocks to the sketches.
+
+        Parameters:
+        factors (pd.DataFrame): Rows of build_factor_matrix output.
+        groups (pd.Series): Peer group per stock, aligned with ``factors``.
+        """
+        for column, _ in FACTOR_COLUMNS.values():
+            values = factors[column]
+            self._sketch(ALL_GROUP, column).update_many(values.dropna())
+            for group, group_values in values.groupby(groups.reindex(factors.index)):
+                self._sketch(group, column).update_many(group_values.dropna())
+
+    def merge(self, other):
+        """Fold the sketches of another shard into these."""
+        for (group, column), sketch in other.sketches.items():
+            self._sketch(group, column).merge(sketch)
+
+    def percentiles(self, factors, groups):
+        """
+        Place each stock's factors within its peer group.
+
+        Parameters:
+        factors (pd.DataFrame): Output of build_factor_matrix.
+        groups (pd.Series): Peer group per stock, aligned with ``factors``.
+
+        Returns:
+        pd.DataFrame: Percentile (0-1) per raw factor column, indexed like ``factors``.
+        """
+        groups = groups.reindex(factors.index)
+        result = pd.DataFrame(index=factors.index, dtype=float)
+        for column, _ in FACTOR_COLUMNS.values():
+            result[column] = np.nan
+            for group in groups.unique():
+                sketch = self.sketches.get((group, column))
+                if sketch is None or sketch.n < MIN_GROUP_SIZE:
+                    sketch = self._sketch(ALL_GROUP, column)
+                rows = (groups == group).to_numpy()
+                result.loc[rows, column] = sketch.percentiles(factors.loc[rows, column].to_numpy())
+        return result
+
+def score_factor_percentiles(percentiles, weights=None):
+    """
+    Turn peer-group percentiles into 0-10 factor scores and a weighted overall score.
+
+    Parameters:
+    percentiles (pd.DataFrame): Output of FactorSketches.percentiles.
+    weights (dict): Weight per factor (momentum, pe, debt, roe); normalised to sum to 1.
+
+    Returns:
+    pd.DataFrame: Columns momentum, pe, debt, roe and overall, indexed like ``percentiles``.
+    """
+    scores = pd.DataFrame(index=percentiles.index)
+    for factor, (column, higher_is_better) in FACTOR_COLUMNS.items():
+        pct = percentiles[column].fillna(0.5)  # Missing values sit mid-pack
+        scores[factor] = 10 * (pct if higher_is_better else 1 - pct)
+    scores["overall"] = _weighted_overall(scores, weights)
+    return scores
+
+def rank_stocks(factors, weights=None, thresholds=None, top_k=3, percentiles=None):
+    """
+    Re-rank a precomputed factor matrix and pick the top stocks.
+
+    Parameters:
+    factors (pd.DataFrame): Output of build_factor_matrix.
+    weights (dict): Weight per factor.
+    thresholds (dict): Overrides for DEFAULT_THRESHOLDS.
+    top_k (int): Number of stocks to return.
+    percentiles (pd.DataFrame): Optional peer-group percentiles (FactorSketches.percentiles);
+        when given, factors are scored by percentile instead of absolute thresholds.
+
+    Returns:
+    list: Tuples of (stock, momentum, pe_score, debt_score, roe_score, overall), best first.
+    """
+    if percentiles is None:
+        scores = score_factor_matrix(factors, weights, thresholds)
+        factor_score = int
+    else:
+        scores = score_factor_percentiles(percentiles, weights)
+        factor_score = lambda value: round(float(value), 1)
+    top = scores.nlargest(top_k, "overall", keep="first")
+    return [
+        (stock, float(row.momentum), factor_score(row.pe), factor_score(row.debt), factor_score(row.roe), float(row.overall))
+        for stock, row in zip(top.index, top.itertuples(index=False))
+    ]
+
+def compute_stock_scores(stock_data, weights=None, thresholds=None, top_k=3):
+    """
+    Compute stock scores based on momentum, valuation, leverage and profitability.
+
+    Parameters:
+    stock_data (dict): A dictionary containing stock data.
+    weights (dict): Optional weight per factor; equal weights by default.
+    thresholds (dict): Optional overrides for DEFAULT_THRESHOLDS.
+    top_k (int): Number of top stocks to return.
+
+    Returns:
+    tuple: A tuple containing a list of tuples with stock data and the count of valid stocks.
+    """
+    factors = build_factor_matrix(stock_data)
+    return rank_stocks(factors, weights, thresholds, top_k), len(factors)  # Top stocks and valid stock count
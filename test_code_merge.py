@@ -0,0 +1,118 @@
+import pytest
+
+from code_merge import merge_python_source
+
+ORIGINAL = '''import os
+
+
+def a():
+    return 1
+
+
+def b():
+    x = 1
+    y = 2
+    return x + y
+
+
+# Greeting
+print("hello")
+
+with open("settings.txt") as fh:
+    settings = fh.read()
+
+if __name__ == "__main__":
+    b()
+'''
+
+
+def merge_twice(original, new):
+    """Merge, and check that merging the same content again changes nothing."""
+    merged = merge_python_source(original, new)
+    assert merge_python_source(merged, new) == merged
+    return merged
+
+
+def test_full_file_is_unchanged():
+    assert merge_twice(ORIGINAL, ORIGINAL) == ORIGINAL
+
+
+def test_changed_function_replaced_in_place():
+    merged = merge_twice(ORIGINAL, "def a():\n    return 2\n")
+    assert "return 2" in merged
+    assert "return 1" not in merged
+    assert merged.index("def a") < merged.index("def b")
+
+
+@pytest.mark.parametrize("snippet, expected_body", [
+    # Edited line right after the marker
+    ("def b():\n    x = 1\n    ...\n    return x + y + 1\n", ["x = 1", "y = 2", "return x + y + 1"]),
+    # Edited line right before the marker
+    ("def b():\n    x = 5\n    ...\n    return x + y\n", ["x = 5", "y = 2", "return x + y"]),
+    # Inserted line next to the marker
+    ("def b():\n    x = 1\n    ...\n    print(y)\n    return x + y\n", ["x = 1", "y = 2", "print(y)", "return x + y"]),
+    # Consecutive markers
+    ("def b():\n    ...\n    ...\n    return x + y + 1\n", ["x = 1", "y = 2", "return x + y + 1"]),
+])
+def test_elision_markers_keep_only_unedited_lines(snippet, expected_body):
+    merged = merge_twice(ORIGINAL, snippet)
+    body = merged[merged.index("def b():"):merged.index("# Greeting")]
+    assert [line.strip() for line in body.splitlines()[1:] if line.strip()] == expected_body
+
+
+def test_edited_statement_replaces_original():
+    merged = merge_twice(ORIGINAL, 'print("hello world")\n')
+    assert 'print("hello world")' in merged
+    assert 'print("hello")' not in merged
+    assert "# Greeting" in merged
+
+
+def test_edited_block_replaces_original():
+    snippet = 'with open("settings.txt") as fh:\n    settings = fh.read().strip()\n'
+    merged = merge_twice(ORIGINAL, snippet)
+    assert merged.count("with open(") == 1
+    assert "fh.read().strip()" in merged
+
+
+def test_new_function_inserted_before_main_guard():
+    merged = merge_twice(ORIGINAL, "def c():\n    return 3\n")
+    assert merged.index("def c") < merged.index('if __name__ == "__main__"')
+    assert merged.count("def c") == 1
+
+
+def test_new_import_goes_with_imports():
+    merged = merge_twice(ORIGINAL, "import sys\n")
+    assert merged.index("import sys") < merged.index("def a")
+
+
+def test_unrelated_statement_is_added_not_merged():
+    merged = merge_twice(ORIGINAL, 'raise SystemExit("done")\n')
+    assert 'print("hello")' in merged
+    assert 'raise SystemExit("done")' in merged
+
+
+def test_full_file_drops_deleted_statements():
+    full = ORIGINAL.replace('# Greeting\nprint("hello")\n\n', "")
+    merged = merge_twice(ORIGINAL, full)
+    assert merged == full
+    assert 'print("hello")' not in merged
+
+
+def test_full_file_rename_keeps_only_new_name():
+    full = ORIGINAL.replace("def a():", "def first():")
+    merged = merge_twice(ORIGINAL, full)
+    assert "def first():" in merged
+    assert "def a():" not in merged
+
+
+def test_snippet_with_marker_keeps_the_rest():
+    snippet = "import os\n\n\ndef a():\n    return 2\n\n\n# ...\n"
+    merged = merge_twice(ORIGINAL, snippet)
+    assert "return 2" in merged
+    assert 'print("hello")' in merged
+    assert "def b():" in merged
+
+
+def test_invalid_source_raises():
+    with pytest.raises(SyntaxError):
+        merge_python_source(ORIGINAL, "def broken(:\n")
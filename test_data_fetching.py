@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+pytest.importorskip("yfinance")
+os.environ.setdefault("NEWS_API_KEY", "test-key")
+os.environ.setdefault("GITHUB_ACTIONS", "true")  # Read the key from the environment, not st.secrets
+import requests
+
+import data_fetching
+import request_scheduler
+import ticker_health
+
+
+@pytest.fixture(autouse=True)
+def fresh_health(monkeypatch):
+    monkeypatch.setattr(ticker_health, "_tickers", {})
+    monkeypatch.setattr(ticker_health, "_sources", {})
+    monkeypatch.setattr(request_scheduler, "backoff_delay", lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(request_scheduler, "_limits", lambda provider: {"rate": 1e9, "burst": 1e9, "concurrency": 8})
+    monkeypatch.setattr(request_scheduler, "_buckets", {})
+
+
+def failing_ticker(error):
+    class Ticker:
+        def __init__(self, symbol):
+            pass
+
+        def history(self, **kwargs):
+            raise error
+
+    return Ticker
+
+
+def test_transient_errors_leave_snapshot_incomplete(monkeypatch):
+    monkeypatch.setattr(data_fetching.yf, "Ticker", failing_ticker(requests.exceptions.ReadTimeout("timed out")))
+    snapshot = data_fetching.fetch_stock_data(["AAA", "BBB"])
+
+    assert snapshot == {"AAA": None, "BBB": None}
+    assert not data_fetching.is_complete_snapshot(snapshot)
+    # Yahoo took the blame, the tickers did not
+    assert ticker_health.health_report()["tickers"] == []
+    assert ticker_health.should_fetch("AAA") and ticker_health.should_fetch("BBB")
+
+
+def test_ticker_errors_negative_cache_the_ticker(monkeypatch):
+    monkeypatch.setattr(data_fetching.yf, "Ticker", failing_ticker(KeyError("regularMarketPrice")))
+    snapshot = data_fetching.fetch_stock_data(["AAA"])
+
+    assert snapshot == {"AAA": None}
+    assert data_fetching.is_complete_snapshot(snapshot)
+    assert not ticker_health.should_fetch("AAA")
@@ -0,0 +1,64 @@
+import numpy as np
+
+import memory_cache
+from memory_cache import MemoryBudgetCache, derived_cache, estimate_size
+
+
+def test_derived_values_count_against_their_source(monkeypatch):
+    monkeypatch.setattr(memory_cache, "_cache", MemoryBudgetCache(10 ** 6))
+
+    @memory_cache.memory_cache(ttl=60)
+    def snapshot():
+        return {"bars": np.zeros(1000)}
+
+    @derived_cache(ttl=60)
+    def double(source):
+        return source["bars"] * 2
+
+    source = snapshot()
+    base = memory_cache.cache_usage()["used_bytes"]
+    view = double(source)
+    assert double(source) is view
+
+    usage = memory_cache.cache_usage()
+    assert usage["used_bytes"] == base + estimate_size(view)
+    assert usage["entries"] == 1
+    assert usage["by_namespace"][f"{__name__}.{double.__qualname__}"]["bytes"] == estimate_size(view)
+
+
+def test_derived_values_are_evicted_with_their_source(monkeypatch):
+    monkeypatch.setattr(memory_cache, "_cache", MemoryBudgetCache(10 ** 6))
+    calls = []
+
+    @derived_cache(ttl=60)
+    def total(source):
+        calls.append(source)
+        return float(source.sum())
+
+    source = np.ones(10)
+    memory_cache._cache.set("snapshot", source, ttl=60, cost=1, namespace="snapshot")
+    total(source)
+    total(source)
+    assert len(calls) == 1
+
+    memory_cache._cache.clear()
+    total(source)
+    total(source)
+    assert len(calls) == 3  # Source no longer cached: computed each time, nothing held
+    assert memory_cache.cache_usage()["used_bytes"] == 0
+
+
+def test_derived_values_respect_max_entries(monkeypatch):
+    monkeypatch.setattr(memory_cache, "_cache", MemoryBudgetCache(10 ** 6))
+
+    @derived_cache(ttl=60, max_entries=2)
+    def scaled(source, factor):
+        return source * factor
+
+    source = np.ones(100)
+    memory_cache._cache.set("snapshot", source, ttl=60, cost=1, namespace="snapshot")
+    for factor in range(5):
+        scaled(source, factor)
+
+    usage = memory_cache.cache_usage()
+    assert usage["used_bytes"] == estimate_size(source) + 2 * estimate_size(source * 1)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from quantile_sketch import KLLSketch
+
+# Largest acceptable gap between estimated and exact percentiles for k=200
+RANK_TOLERANCE = 0.02
+
+
+def exact_percentiles(population, values):
+    population = np.sort(population)
+    below = np.searchsorted(population, values, side="left")
+    at_or_below = np.searchsorted(population, values, side="right")
+    return (below + at_or_below) / (2 * len(population))
+
+
+@pytest.fixture
+def population():
+    return np.random.default_rng(0).lognormal(size=20000)
+
+
+def test_single_sketch_rank_error(population):
+    sketch = KLLSketch(k=200, seed=1)
+    sketch.update_many(population)
+    probes = np.quantile(population, np.linspace(0.01, 0.99, 99))
+    assert np.abs(sketch.percentiles(probes) - exact_percentiles(population, probes)).max() <= RANK_TOLERANCE
+    assert sketch.size < 3 * sketch.k  # Memory stays bounded
+
+
+def test_merged_sketch_matches_single_sketch(population):
+    single = KLLSketch(k=200, seed=1)
+    single.update_many(population)
+
+    merged = KLLSketch(k=200, seed=2)
+    for seed, shard in enumerate(np.array_split(population, 4), start=3):
+        part = KLLSketch(k=200, seed=seed)
+        part.update_many(shard)
+        merged.merge(part)
+
+    probes = np.quantile(population, np.linspace(0.01, 0.99, 99))
+    exact = exact_percentiles(population, probes)
+    assert merged.n == len(population)
+    assert np.abs(merged.percentiles(probes) - exact).max() <= RANK_TOLERANCE
+    assert np.abs(merged.percentiles(probes) - single.percentiles(probes)).max() <= 2 * RANK_TOLERANCE
+
+
+def test_nan_inputs_stay_nan():
+    sketch = KLLSketch(seed=0)
+    sketch.update_many([1.0, 2.0, 3.0])
+    result = sketch.percentiles([np.nan, 2.0])
+    assert np.isnan(result[0])
+    assert result[1] == pytest.approx(0.5)
+
+
+def test_empty_sketch():
+    sketch = KLLSketch(seed=0)
+    result = sketch.percentiles([np.nan, 7.0])
+    assert np.isnan(result[0])
+    assert result[1] == 0.5
+    assert np.isnan(sketch.quantile(0.5))
@@ -0,0 +1,71 @@
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip("textblob")
+from textblob import TextBlob
+
+from sentiment import aggregate_sentiment, batch_polarity, load_lexicon
+
+# batch_polarity must stay within this of TextBlob's polarity
+TOLERANCE = 0.05
+
+HEADLINES = [
+    "Tesla's outlook isn't great...",
+    "Tesla's outlook isn't great… shares fall",
+    "Stocks are not very good today!",
+    "Nvidia posts record revenue as AI demand stays extremely strong",
+    "Shares slump after disappointing guidance; analysts cut targets",
+    "Not a bad quarter for Apple, but iPhone sales were weak",
+    "Coinbase really not happy with SEC ruling",
+    "Amazing results!!! Investors cheer",
+    "U.S. stocks rally as Fed signals a calm, steady path",
+    "Palantir's 'incredibly positive' contract win lifts shares",
+    "Markets never looked so uncertain: volatility spikes",
+    "AMD doesn't expect a slowdown, CEO says",
+    "Regulators warn of serious risks in crypto lending",
+    "Sony beats estimates; PlayStation sales surprisingly robust",
+    "Alibaba shares flat ahead of earnings (e.g. cloud, commerce)",
+    "",
+    None,
+]
+
+
+def assert_close_to_textblob(texts):
+    expected = np.array([TextBlob(text or "").sentiment.polarity for text in texts])
+    actual = batch_polarity(texts)
+    worst = int(np.argmax(np.abs(expected - actual)))
+    assert np.abs(expected - actual).max() <= TOLERANCE, \
+        f"{texts[worst]!r}: TextBlob {expected[worst]:+.3f}, batch {actual[worst]:+.3f}"
+
+
+def test_headlines_match_textblob():
+    assert_close_to_textblob(HEADLINES)
+
+
+def test_random_word_strings_match_textblob():
+    rng = random.Random(0)
+    words = list(load_lexicon()["vocab"])
+    fillers = ["not", "no", "never", "a", "is", "the", "isn't", "don't", "!", "...", ",", ".", "very",
+               "really", "Mr.", "U.S.", "(", ")", '"', "’", "shares", "x", "--"]
+    texts = [
+        " ".join(rng.choice(words) if rng.random() < 0.45 else rng.choice(fillers) for _ in range(rng.randint(1, 15)))
+        for _ in range(2000)
+    ]
+    assert_close_to_textblob(texts)
+
+
+def test_empty_batch():
+    assert batch_polarity([]).shape == (0,)
+
+
+def test_recency_weighting_survives_very_old_articles():
+    # Thousands of half-lives old: absolute weights would all underflow to 0
+    score = aggregate_sentiment([0.5, -0.5], ["2001-01-01T00:00:00Z", "2000-01-01T00:00:00Z"], half_life_hours=1)
+    assert score == pytest.approx(0.5)
+
+
+def test_plain_mean_without_half_life():
+    assert aggregate_sentiment([0.2, 0.4]) == pytest.approx(0.3)
+    assert aggregate_sentiment([]) == 0
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_scoring import MIN_GROUP_SIZE, FactorSketches
+
+
+def make_factors(values):
+    """Factor matrix with the given momentum values and constant fundamentals."""
+    index = [f"S{i}" for i in range(len(values))]
+    return pd.DataFrame(
+        {"momentum": values, "pe_ratio": 15.0, "debt_equity": 1.0, "return_on_equity": 0.1}, index=index
+    )
+
+
+def test_small_group_falls_back_to_whole_universe():
+    factors = make_factors([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 100.0])
+    groups = pd.Series(["Tech"] * 6 + ["Tiny"], index=factors.index)
+    assert (groups == "Tiny").sum() < MIN_GROUP_SIZE
+
+    sketches = FactorSketches()
+    sketches.update(factors, groups)
+    percentiles = sketches.percentiles(factors, groups)
+
+    # Alone in its group it would sit at 0.5; against the universe it tops the list
+    assert percentiles.loc["S6", "momentum"] == pytest.approx(13 / 14)
+    # Tech is big enough to be ranked within itself
+    assert percentiles.loc["S5", "momentum"] == pytest.approx(11 / 12)
+
+
+def test_missing_factor_stays_missing():
+    factors = make_factors([1.0, np.nan, 3.0, 4.0])
+    groups = pd.Series("Tech", index=factors.index)
+    sketches = FactorSketches()
+    sketches.update(factors, groups)
+    percentiles = sketches.percentiles(factors, groups)
+    assert np.isnan(percentiles.loc["S1", "momentum"])
+    assert percentiles.loc["S3", "momentum"] == pytest.approx(5 / 6)
+
+
+def test_merged_shards_match_one_pass():
+    factors = make_factors(np.random.default_rng(0).normal(size=400))
+    groups = pd.Series(np.where(np.arange(400) % 2, "Tech", "Energy"), index=factors.index)
+
+    whole = FactorSketches()
+    whole.update(factors, groups)
+
+    merged = FactorSketches()
+    for shard in np.array_split(np.arange(400), 4):
+        part = FactorSketches()
+        part.update(factors.iloc[shard], groups.iloc[shard])
+        merged.merge(part)
+
+    expected = whole.percentiles(factors, groups)
+    actual = merged.percentiles(factors, groups)
+    assert np.abs(actual["momentum"] - expected["momentum"]).max() <= 0.01
@@ -0,0 +1,110 @@
+import pytest
+
+import ticker_health
+from ticker_health import (BASE_PROBE_INTERVAL, BREAKER_COOLDOWN, BREAKER_FAILURE_THRESHOLD, MAX_PROBE_INTERVAL,
+                           record_source_result, record_ticker_failure, record_ticker_success, should_fetch,
+                           source_available)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ticker_health, "_tickers", {})
+    monkeypatch.setattr(ticker_health, "_sources", {})
+    monkeypatch.setattr(ticker_health.time, "time", clock)
+    return clock
+
+
+def source_state(source):
+    return {entry["source"]: entry["state"] for entry in ticker_health.health_report()["sources"]}.get(source)
+
+
+def trip(source):
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        record_source_result(source, False)
+
+
+def test_breaker_opens_after_threshold(clock):
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        record_source_result("yahoo", False)
+    assert source_available("yahoo")
+    record_source_result("yahoo", False)
+    assert not source_available("yahoo")
+    assert source_state("yahoo") == "open"
+
+
+def test_success_resets_failure_count(clock):
+    for _ in range(BREAKER_FAILURE_THRESHOLD - 1):
+        record_source_result("yahoo", False)
+    record_source_result("yahoo", True)
+    record_source_result("yahoo", False)
+    assert source_available("yahoo")
+
+
+def test_half_open_lets_one_probe_through(clock):
+    trip("yahoo")
+    clock.now += BREAKER_COOLDOWN - 1
+    assert not source_available("yahoo")
+    clock.now += 1
+    assert source_available("yahoo")
+    assert not source_available("yahoo")  # Only one trial call while it is in flight
+    assert source_state("yahoo") == "half-open"
+
+
+def test_probe_success_closes_breaker(clock):
+    trip("yahoo")
+    clock.now += BREAKER_COOLDOWN
+    assert source_available("yahoo")
+    record_source_result("yahoo", True)
+    assert source_available("yahoo")
+    assert source_available("yahoo")
+    assert source_state("yahoo") == "closed"
+
+
+def test_probe_failure_reopens_breaker(clock):
+    trip("yahoo")
+    clock.now += BREAKER_COOLDOWN
+    assert source_available("yahoo")
+    record_source_result("yahoo", False)
+    assert not source_available("yahoo")
+    assert source_state("yahoo") == "open"
+    clock.now += BREAKER_COOLDOWN  # A fresh cooldown starts from the failed probe
+    assert source_available("yahoo")
+
+
+def test_breakers_are_per_source(clock):
+    trip("newsapi")
+    assert source_available("yahoo")
+    assert not source_available("newsapi")
+
+
+def test_negative_cache_backs_off_exponentially(clock):
+    start = clock.now
+    for failures in range(1, 4):
+        record_ticker_failure("BAD", "delisted")
+        clock.now = start + BASE_PROBE_INTERVAL * 2 ** (failures - 1) - 1
+        assert not should_fetch("BAD")
+        clock.now += 1
+        assert should_fetch("BAD")
+        start = clock.now
+
+
+def test_negative_cache_interval_is_capped(clock):
+    for _ in range(20):
+        record_ticker_failure("BAD", "delisted")
+    assert ticker_health.health_report()["tickers"][0]["retry_in"] == MAX_PROBE_INTERVAL
+
+
+def test_success_clears_negative_cache(clock):
+    record_ticker_failure("BAD", "timeout")
+    assert not should_fetch("BAD")
+    record_ticker_success("BAD")
+    assert should_fetch("BAD")
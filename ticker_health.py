@@ -0,0 +1,131 @@
+import threading
+import time
+
+# Negative cache: a failing ticker is skipped until its next probe time,
+# which doubles with every consecutive failure.
+BASE_PROBE_INTERVAL = 15 * 60  # Seconds
+MAX_PROBE_INTERVAL = 24 * 60 * 60  # Seconds
+
+# Circuit breaker per data source
+BREAKER_FAILURE_THRESHOLD = 5  # Consecutive failures before the breaker opens
+BREAKER_COOLDOWN = 5 * 60  # Seconds the breaker stays open before a trial call
+
+_lock = threading.Lock()
+_tickers = {}  # ticker -> {"failures", "last_error", "last_failure", "next_probe"}
+_sources = {}  # source -> {"failures", "opened_at", "probing"}
+
+
+def should_fetch(ticker):
+    """
+    Check whether a ticker is due for a fetch.
+
+    Parameters:
+    - ticker (str): Stock ticker.
+
+    Returns:
+    - bool: False while the ticker sits in the negative cache.
+    """
+    now = time.time()
+    with _lock:
+        state = _tickers.get(ticker)
+        return state is None or now >= state["next_probe"]
+
+
+def record_ticker_success(ticker):
+    """Clear a ticker's failure history after a good fetch."""
+    with _lock:
+        _tickers.pop(ticker, None)
+
+
+def record_ticker_failure(ticker, error):
+    """
+    Put a ticker in the negative cache, backing off exponentially on repeated failures.
+
+    Parameters:
+    - ticker (str): Stock ticker.
+    - error (str): Why the fetch was unusable.
+    """
+    now = time.time()
+    with _lock:
+        state = _tickers.setdefault(ticker, {"failures": 0})
+        state["failures"] += 1
+        state["last_error"] = error
+        state["last_failure"] = now
+        interval = min(BASE_PROBE_INTERVAL * 2 ** (state["failures"] - 1), MAX_PROBE_INTERVAL)
+        state["next_probe"] = now + interval
+
+
+def source_available(source):
+    """
+    Check a data source's circuit breaker.
+
+    A closed breaker lets every call through. An open breaker blocks calls
+    until its cooldown ends, then lets a single trial call through
+    (half-open); that call's outcome closes or re-opens it.
+
+    Parameters:
+    - source (str): Data source name, e.g. "yahoo" or "newsapi".
+
+    Returns:
+    - bool: True if a call to the source may proceed.
+    """
+    now = time.time()
+    with _lock:
+        state = _sources.get(source)
+        if state is None or state["opened_at"] is None:
+            return True
+        if state["probing"] or now - state["opened_at"] < BREAKER_COOLDOWN:
+            return False
+        state["probing"] = True
+        return True
+
+
+def record_source_result(source, ok):
+    """
+    Feed a call outcome into a data source's circuit breaker.
+
+    Parameters:
+    - source (str): Data source name.
+    - ok (bool): Whether the call succeeded.
+    """
+    now = time.time()
+    with _lock:
+        state = _sources.setdefault(source, {"failures": 0, "opened_at": None, "probing": False})
+        if ok:
+            state.update(failures=0, opened_at=None, probing=False)
+            return
+        state["failures"] += 1
+        if state["probing"] or state["failures"] >= BREAKER_FAILURE_THRESHOLD:
+            state.update(opened_at=now, probing=False)
+
+
+def health_report():
+    """
+    Summarise negative-cached tickers and open circuit breakers.
+
+    Returns:
+    - dict: ``{"tickers": [...], "sources": [...]}`` where each ticker entry has
+      ticker, failures, last_error and retry_in (seconds), and each source entry
+      has source, state ("closed", "open" or "half-open") and failures.
+    """
+    now = time.time()
+    with _lock:
+        tickers = [
+            {
+                "ticker": ticker,
+                "failures": state["failures"],
+                "last_error": state["last_error"],
+                "retry_in": max(0, state["next_probe"] - now),
+            }
+            for ticker, state in sorted(_tickers.items())
+        ]
+        sources = []
+        for source, state in sorted(_sources.items()):
+            if state["opened_at"] is None:
+                status = "closed"
+            elif state["probing"] or now - state["opened_at"] >= BREAKER_COOLDOWN:
+                status = "half-open"
+            else:
+                status = "open"
+            sources.append({"source": source, "state": status, "failures": state["failures"]})
+    return {"tickers": tickers, "sources": sources}
@@ -3,8 +3,8 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.subplots as sp
+from bar_store import get_bars
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
 def create_stock_recommendation_table(top_stocks, stock_data, generate_ai_commentary):
     """
     Create a compact and visual stock recommendation table.
@@ -23,7 +23,7 @@ def create_stock_recommendation_table(top_stocks, stock_data, generate_ai_commen
     # Creating DataFrame for better visualization
     table_data = []
     for stock, momentum, pe_score, debt_score, roe_score, overall in top_stocks:
-        financials = stock_data.get(stock, {}).get("financials", {})
+        financials = (stock_data.get(stock) or {}).get("financials", {})
         if not financials:
             continue
 
@@ -70,7 +70,6 @@ def create_stock_recommendation_table(top_stocks, stock_data, generate_ai_commen
         height=400  # Fixed height for better scrolling
     )
 
-@st.cache_data(ttl=300)  # Cache for 5 minutes
 def format_stock_metrics(momentum, pe_score, debt_score, roe_score, overall):
     """Format stock metrics for display with consistent styling."""
     return {
@@ -81,7 +80,6 @@ def format_stock_metrics(momentum, pe_score, debt_score, roe_score, overall):
         "Overall Score": f"{overall:.2f}/10"
     }
 
-@st.cache_data(ttl=300)
 def display_data_overview(stock_data, computed_scores):
     """
     Display an overview of the stock data distribution and scoring metrics.
@@ -202,7 +200,23 @@ def display_data_overview(stock_data, computed_scores):
         score_coverage = (valid_scores / total_stocks) * 100 if total_stocks > 0 else 0
         st.metric("Valid Score Data", f"{score_coverage:.1f}%")
 
-def display_top_stocks(top_stocks, stock_data, generate_ai_commentary):
+def get_price_view(stock, stock_data, resolution="1d", window="6mo"):
+    """
+    Get a stock's bars at the requested resolution and window without refetching.
+
+    Args:
+        stock (str): Stock ticker
+        stock_data (dict): Dictionary containing detailed stock information
+        resolution (str): Bar resolution ("1d", "1wk", "1mo")
+        window (str): Lookback window ("1mo", "3mo", "6mo", "1y", "ytd", "max")
+
+    Returns:
+        pd.DataFrame or None: Resampled price bars
+    """
+    # Views are derived from the snapshot's own base bars, so they match whichever worker fetched it
+    return get_bars(stock_data, stock, resolution, window)
+
+def display_top_stocks(top_stocks, stock_data, generate_ai_commentary, chart_resolution="1d", chart_window="6mo"):
     """
     Display the top selected stocks with AI commentary.
     
@@ -210,6 +224,8 @@ def display_top_stocks(top_stocks, stock_data, generate_ai_commentary):
         top_stocks (list): List of tuples containing stock data
         stock_data (dict): Dictionary containing detailed stock information
         generate_ai_commentary (callable): Function to generate AI analysis
+        chart_resolution (str): Bar resolution for the price charts
+        chart_window (str): Lookback window for the price charts
     """
     if not top_stocks:
         st.warning("No top stocks available.")
@@ -228,7 +244,7 @@ def display_top_stocks(top_stocks, stock_data, generate_ai_commentary):
             continue
 
         stock, momentum, pe_score, debt_score, roe_score, overall = stock_data_entry
-        financials = stock_data.get(stock, {}).get("financials", {})
+        financials = (stock_data.get(stock) or {}).get("financials", {})
 
         # Skip if no financial data
         if not financials:
@@ -260,6 +276,13 @@ def display_top_stocks(top_stocks, stock_data, generate_ai_commentary):
             </div>
             """, unsafe_allow_html=True)
 
+            # Price chart resampled from the snapshot's bars
+            bars = get_price_view(stock, stock_data, chart_resolution, chart_window)
+            if bars is not None and len(bars) > 0 and "Close" in bars:
+                fig = px.line(bars, x=bars.index, y="Close")
+                fig.update_layout(height=200, margin=dict(l=0, r=0, t=10, b=0), xaxis_title=None, yaxis_title=None)
+                st.plotly_chart(fig, use_container_width=True)
+
             # Generate and display AI commentary
             ai_comment = generate_ai_commentary(stock, financials, (momentum, pe_score, debt_score, roe_score))
             st.markdown(f"""
@@ -274,7 +297,7 @@ def display_top_stocks(top_stocks, stock_data, generate_ai_commentary):
             </div>
             """, unsafe_allow_html=True)
 
-def create_comprehensive_stock_view(top_stocks, stock_data, generate_ai_commentary):
+def create_comprehensive_stock_view(top_stocks, stock_data, generate_ai_commentary, chart_resolution="1d", chart_window="6mo"):
     """
     Create a comprehensive, compact view of top stock picks with multiple visualizations.
 
@@ -282,6 +305,8 @@ def create_comprehensive_stock_view(top_stocks, stock_data, generate_ai_commenta
     top_stocks (list): A list of top stock tuples.
     stock_data (dict): A dictionary containing stock data.
     generate_ai_commentary (function): A function to generate AI commentary.
+    chart_resolution (str): Bar resolution for the price/volume plots.
+    chart_window (str): Lookback window for the price/volume plots.
     """
     # Slice to top 3 stocks
     top_3_stocks = top_stocks[:3]
@@ -348,7 +373,7 @@ def create_comprehensive_stock_view(top_stocks, stock_data, generate_ai_commenta
         # Add price and volume plots for each stock
         for idx, stock in enumerate([s[0] for s in top_3_stocks], 1):
             try:
-                data = stock_data[stock]["price_data"]
+                data = get_price_view(stock, stock_data, chart_resolution, chart_window)
                 if data is None or len(data) == 0:
                     st.warning(f"No price data available for {stock}")
                     continue
@@ -402,7 +427,3 @@ def create_comprehensive_stock_view(top_stocks, stock_data, generate_ai_commenta
             continue
 
     return top_3_stocks
-
-
-# New additions from Discord
-...
\ No newline at end of file